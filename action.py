@@ -1,24 +1,103 @@
 from prompt_dict import prompt_dict
 from ai_generator import AIGenerator
+from conversation_memory import estimate_tokens, format_turn, get_conversation_memory
 from database import Database
+from db_pool import PoolExhaustedError
+from recurrence import DATETIME_FORMAT, first_occurrence, parse_recurrence
 import json
+import os
+
+# Prompt (and fallback text) used to extract the fields each intent needs
+EXTRACTION_PROMPTS = {
+    "CREATE_PROFILE": ("BREED_AGE_PROMPT", None),
+    "CARE_ROUTINE": ("CARE_ROUTINE_PROMPT", "Extract care routine information including pet name, care type, description, frequency, and time from:"),
+    "HEALTH": ("HEALTH_EXTRACT_PROMPT", "Extract pet health query information:"),
+}
+
+# Fields used when extraction fails or leaves them out
+DEFAULT_FIELDS = {
+    "CREATE_PROFILE": {"name": None, "breed": None, "age": None},
+    "CARE_ROUTINE": {"pet_name": None, "care_type": None, "description": None, "frequency": None,
+                     "time_of_day": None},
+    "HEALTH": {"pet_name": None, "query_category": "general", "symptoms": None},
+}
+
+# Reply when the database pool is saturated, instead of answering as if no data existed
+BUSY_REPLY = "Sorry, I'm a little overloaded right now. Please try again in a moment."
 
 class Action:
-    def __init__(self):
+    def __init__(self, reminder_scheduler=None):
         self.instructionType = None
         self.ai_generator = AIGenerator()
         self.db = Database()
+        self.reminder_scheduler = reminder_scheduler
+        self.memory = get_conversation_memory(self.db)
+        self.health_prompt_budget = int(os.getenv("HEALTH_PROMPT_TOKEN_BUDGET", "1500"))
+
+    def extract_fields(self, instruction_type, transcript):
+        """Run the intent's extraction prompt and return its parsed fields"""
+        prompt_key, fallback = EXTRACTION_PROMPTS[instruction_type]
+        response_text = self.ai_generator.generate_for_template(prompt_key, transcript, fallback)
+        return self._parse_fields(instruction_type, response_text)
+
+    def _parse_fields(self, instruction_type, response_text):
+        try:
+            fields = json.loads(response_text)
+        except (json.JSONDecodeError, TypeError):
+            fields = None
+        return self._normalize_fields(instruction_type, fields)
+
+    def _normalize_fields(self, instruction_type, fields):
+        normalized = dict(DEFAULT_FIELDS.get(instruction_type, {}))
+        if isinstance(fields, dict):
+            normalized.update(fields)
+        return normalized
+
+    def classify_and_extract(self, transcript):
+        """Fused mode: one LLM call returning the intent and that intent's fields.
+
+        Returns (intent, fields), or (None, None) if the reply can't be used.
+        """
+        response_text = self.ai_generator.generate_for_template("FUSED_INTENT_PROMPT", transcript)
+        try:
+            result = json.loads(response_text)
+        except (json.JSONDecodeError, TypeError):
+            print(f"Fused intent reply was not JSON: {response_text}")
+            return None, None
+
+        if not isinstance(result, dict):
+            return None, None
+        intent = str(result.get("intent") or "").strip().upper()
+        if not intent:
+            return None, None
+        if intent in DEFAULT_FIELDS:
+            return intent, self._normalize_fields(intent, result.get("fields"))
+        return intent, {}
+
+    def take_action(self, instruction_type, transcript, id, on_delta=None, fields=None):
+        """Run the intent's handler.
 
-    def take_action(self, instruction_type, transcript, id):
+        fields, when given, are the already-extracted slots for the intent (fused or
+        speculative extraction), so no second LLM call is made. on_delta, when given,
+        receives HEALTH answer tokens as they stream.
+        """
         instruction_type = instruction_type.strip()
         self.instructionType = instruction_type
+        if fields is None and instruction_type in EXTRACTION_PROMPTS:
+            fields = self.extract_fields(instruction_type, transcript)
+
+        try:
+            return self._run_instruction(instruction_type, transcript, id, on_delta, fields)
+        except PoolExhaustedError as e:
+            print(f"⚠️ {e}")
+            return BUSY_REPLY
+
+    def _run_instruction(self, instruction_type, transcript, id, on_delta, fields):
         if instruction_type == "CREATE_PROFILE":
-            prompt = f"""{prompt_dict.get("BREED_AGE_PROMPT")} {transcript}"""
-            response_text = self.ai_generator.generate_response(prompt)
-            try:
-                name_breed_age = json.loads(response_text)
-            except json.JSONDecodeError:
-                name_breed_age = {"name": None, "breed": None, "age": None}
+            name_breed_age = fields
+            existing = self.db.get_pet_by_name(name_breed_age["name"], id) if name_breed_age["name"] else None
+            if existing:
+                return self._update_profile(existing, name_breed_age, id)
             if not name_breed_age["name"] and name_breed_age["breed"] and not name_breed_age["age"]:
                 return "Please provide your pet's breed and age."
             elif not name_breed_age["name"]:
@@ -40,15 +119,7 @@ class Action:
                 else:
                     return "Trouble creating pet profile"
         elif instruction_type == "CARE_ROUTINE":
-            # Extract care routine information using AI
-            prompt = f"""{prompt_dict.get("CARE_ROUTINE_PROMPT", "Extract care routine information including pet name, care type, description, frequency, and time from:")} {transcript}"""
-            response_text = self.ai_generator.generate_response(prompt)
-
-            try:
-                care_info = json.loads(response_text)
-            except json.JSONDecodeError:
-                care_info = {"pet_name": None, "care_type": None, "description": None, "frequency": None,
-                             "time_of_day": None}
+            care_info = fields
 
             # Validate required fields
             if not care_info.get("pet_name"):
@@ -74,22 +145,28 @@ class Action:
                 'time_of_day': care_info.get("time_of_day"),
                 'is_active': True
             }
+            # Normalize the free-text schedule once here so due reminders are a range query on next_due_at
+            recurrence = parse_recurrence(care_info["frequency"], care_info.get("time_of_day"))
+            notification_data['recurrence'] = recurrence
+            notification_data['next_due_at'] = first_occurrence(recurrence).strftime(DATETIME_FORMAT)
 
             # Insert notification
             inserted = self.db.insert_data("notifications", notification_data, user_context=id)
+            if inserted and self.reminder_scheduler:
+                # Picked up incrementally; the scheduler never rescans the table
+                self.reminder_scheduler.schedule({
+                    **notification_data,
+                    'id': inserted,
+                    'owner': id,
+                    'pet_name': care_info["pet_name"],
+                })
             if inserted:
                 return f"Care routine set up successfully for {care_info['pet_name']}: {care_info['care_type']} - {care_info['frequency']}"
             else:
                 return "Trouble setting up care routine"
 
         elif instruction_type == "HEALTH":
-            prompt = f"""{prompt_dict.get("HEALTH_EXTRACT_PROMPT", "Extract pet health query information:")} {transcript}"""
-            extract_response = self.ai_generator.generate_response(prompt)
-
-            try:
-                health_info = json.loads(extract_response)
-            except json.JSONDecodeError:
-                health_info = {"pet_name": None, "query_category": "general", "symptoms": None}
+            health_info = fields
 
             # Validate pet name
             pet_data = None
@@ -97,15 +174,19 @@ class Action:
             pet_name = health_info.get("pet_name")
 
             if pet_name:
-                pet_data = self.db.get_pet_by_name(pet_name)
+                pet_data = self.db.get_pet_by_name(pet_name, id)
                 if pet_data:
                     pet_id = pet_data[0]  # Assuming ID is first column
                 else:
                     return f"No pet profile found for {pet_name}. Please create a profile first for more personalized advice."
 
             # Generate health response with pet context
-            health_prompt = self._build_health_prompt(health_info, pet_data, transcript)
-            health_response = self.ai_generator.generate_response(health_prompt)
+            health_prompt = self._build_health_prompt(health_info, pet_data, transcript, pet_id)
+            if on_delta:
+                health_response = self.ai_generator.generate_response_stream(health_prompt, on_delta)
+            else:
+                # Free-form answers are only cached when LLM_CACHE_FREE_FORM is enabled
+                health_response = self.ai_generator.generate_cached("HEALTH_RESPONSE_PROMPT", health_prompt)
 
             # Create response summary for logging (first 500 chars)
             response_summary = health_response[:500] + "..." if len(health_response) > 500 else health_response
@@ -128,6 +209,8 @@ class Action:
                 user_context=id
             )
 
+            self.memory.remember(pet_id, transcript, response_summary, health_log_data["query_category"])
+
             return health_response
         elif instruction_type == "GENERAL":
             # TODO: Implement general queries
@@ -136,8 +219,18 @@ class Action:
         else:
             return "I don't understand that instruction type. Please try CREATE_PROFILE or CARE_ROUTINE."
 
-    def _build_health_prompt(self, health_info, pet_data, original_transcript):
-        """Build a comprehensive health prompt with pet context"""
+    def _update_profile(self, pet_data, fields, id):
+        """The owner named a pet they already have: change the breed/age they mentioned"""
+        changes = {column: fields[column] for column in ("breed", "age") if fields.get(column)}
+        if not changes:
+            return f"{fields['name']} already has a profile."
+        updated = self.db.update_data("pet_profile", changes, {"id": pet_data[0], "owner": id}, user_context=id)
+        if updated is False:
+            return "Trouble updating pet profile"
+        return f"Profile updated for {fields['name']}"
+
+    def _build_health_prompt(self, health_info, pet_data, original_transcript, pet_id=None):
+        """Build a comprehensive health prompt with pet context and as much relevant history as fits the budget"""
         base_prompt = prompt_dict.get("HEALTH_RESPONSE_PROMPT", "Provide pet health advice for:")
 
         # Add pet context if available
@@ -156,10 +249,25 @@ class Action:
         if health_info.get("symptoms"):
             symptoms_context = f"\nObserved Symptoms: {health_info.get('symptoms')}"
 
+        history_context = ""
+        full_prompt = self._format_health_prompt(base_prompt, pet_context, category_context,
+                                                 symptoms_context, history_context, original_transcript)
+        history_header = "\nEarlier questions about this pet:\n"
+        remaining = self.health_prompt_budget - estimate_tokens(full_prompt) - estimate_tokens(history_header)
+        history = self.memory.select_context(pet_id, original_transcript, remaining)
+        if history:
+            history_context = history_header + "\n".join(format_turn(turn) for turn in history)
+            full_prompt = self._format_health_prompt(base_prompt, pet_context, category_context,
+                                                     symptoms_context, history_context, original_transcript)
+        return full_prompt
+
+    def _format_health_prompt(self, base_prompt, pet_context, category_context, symptoms_context,
+                              history_context, original_transcript):
         full_prompt = f"""{base_prompt}
     {pet_context}
     {category_context}
     {symptoms_context}
+    {history_context}
 
     User Query: {original_transcript}
 
@@ -1,19 +1,33 @@
 import os
 import requests
 import json
+import time
+
+import metrics
+from http_client import get_http_session, get_timeout
+from llm_cache import cache_key, get_llm_cache
+from prompt_dict import prompt_dict
+
+
+def _is_cacheable_reply(reply):
+    # Failures come back as "Error..." strings; never pin them in the cache
+    return bool(reply) and not reply.startswith("Error")
 
 
 class AIGenerator:
     def __init__(self, model="gpt-3.5-turbo"):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.api_url = "https://api.openai.com/v1/chat/completions"
+        # Overridable so load tests can point at a local stand-in (benchmarks/fake_openai.py)
+        self.api_url = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # Shared across every AIGenerator so calls reuse warm keep-alive connections
+        self.session = get_http_session()
 
-    def generate_response(self, prompt):
+    def _build_payload(self, prompt, stream=False):
         payload = {
             "model": self.model,
             "messages": [
@@ -22,13 +36,20 @@ class AIGenerator:
             "max_tokens": 200,
             "temperature": 0.7
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @metrics.timed("llm", "complete")
+    def generate_response(self, prompt):
+        payload = self._build_payload(prompt)
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 headers=self.headers,
                 json=payload,
-                timeout=60,
+                timeout=get_timeout(),
             )
             response.raise_for_status()
 
@@ -38,4 +59,63 @@ class AIGenerator:
         except requests.RequestException as e:
             return f"Error: {str(e)}"
         except KeyError as e:
-            return f"Error parsing response: {str(e)}"
\ No newline at end of file
+            return f"Error parsing response: {str(e)}"
+
+    def generate_cached(self, template, prompt, transcript=None):
+        """generate_response through the LLM cache, keyed on model, template and normalized transcript"""
+        cache = get_llm_cache()
+        if not cache.is_cacheable(template):
+            return self.generate_response(prompt)
+
+        # Include the template text so edited prompts don't serve stale disk-tier entries
+        template_id = f"{template}\x1f{prompt_dict.get(template, '')}"
+        key = cache_key(self.model, template_id, prompt if transcript is None else transcript)
+        return cache.get_or_compute(key, lambda: self.generate_response(prompt), should_cache=_is_cacheable_reply)
+
+    def generate_for_template(self, template, transcript, fallback=None):
+        """Fill a prompt_dict template with the transcript and generate (cached when deterministic)"""
+        prompt = f"{prompt_dict.get(template, fallback)} {transcript}"
+        return self.generate_cached(template, prompt, transcript)
+
+    @metrics.timed("llm", "stream")
+    def generate_response_stream(self, prompt, on_delta):
+        """Stream the completion, calling on_delta(token) as tokens arrive; returns the full text"""
+        payload = self._build_payload(prompt, stream=True)
+        parts = []
+        started = time.perf_counter()
+
+        try:
+            with self.session.post(
+                self.api_url,
+                headers=self.headers,
+                json=payload,
+                timeout=get_timeout(),
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+
+                # Server-sent events: one "data: {...}" line per chunk, terminated by "data: [DONE]"
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    if not choices:
+                        continue
+                    token = choices[0].get("delta", {}).get("content")
+                    if token:
+                        if not parts:
+                            metrics.observe("llm_first_token", time.perf_counter() - started, "stream")
+                        parts.append(token)
+                        on_delta(token)
+
+            return "".join(parts).strip()
+
+        except requests.RequestException as e:
+            return f"Error: {str(e)}"
+        except (KeyError, json.JSONDecodeError) as e:
+            return f"Error parsing response: {str(e)}"
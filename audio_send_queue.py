@@ -0,0 +1,218 @@
+import asyncio
+import os
+import threading
+from collections import Counter, deque
+
+BYTES_PER_SAMPLE = 2
+BYTES_PER_MS = 32  # pcm_s16le mono @ 16 kHz
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_PAUSE = "pause"
+
+# Summed over every session for /metrics; per-session numbers live on each queue
+_totals = Counter()
+_totals_lock = threading.Lock()
+
+
+def _add_totals(**amounts):
+    with _totals_lock:
+        _totals.update(amounts)
+
+
+def get_totals():
+    with _totals_lock:
+        return dict(_totals)
+
+
+def _aligned(size):
+    return size - size % BYTES_PER_SAMPLE
+
+
+class AudioSendQueue:
+    """Bounded per-session PCM buffer between the Socket.IO handler and the upstream websocket.
+
+    put() never blocks: it appends the frame to a deque (no copy for read-only buffers) and wakes
+    the drain coroutine on the stream's event loop. drain() sends a frame that is already at least
+    min_chunk_ms as a memoryview slice, and joins smaller ones into chunks of up to max_chunk_ms
+    only when a send is due. When the buffer is full the policy decides: drop the oldest audio, or
+    refuse new audio and tell the client to pause until half of the buffer has drained.
+    """
+
+    def __init__(self, loop, max_buffer_ms=None, min_chunk_ms=None, max_chunk_ms=None, policy=None,
+                 on_backpressure=None):
+        self.loop = loop
+        self.max_buffer_bytes = _aligned(int(max_buffer_ms or os.getenv("AUDIO_QUEUE_MAX_MS", "2000")) * BYTES_PER_MS)
+        self.min_chunk_bytes = _aligned(int(min_chunk_ms or os.getenv("AUDIO_COALESCE_MIN_MS", "50")) * BYTES_PER_MS)
+        self.max_chunk_bytes = _aligned(int(max_chunk_ms or os.getenv("AUDIO_COALESCE_MAX_MS", "100")) * BYTES_PER_MS)
+        self.flush_after = self.min_chunk_bytes / BYTES_PER_MS / 1000
+        self.policy = policy or os.getenv("AUDIO_QUEUE_POLICY", POLICY_DROP_OLDEST)
+        if self.policy not in (POLICY_DROP_OLDEST, POLICY_PAUSE):
+            print(f"Unknown AUDIO_QUEUE_POLICY {self.policy!r}, using {POLICY_DROP_OLDEST}")
+            self.policy = POLICY_DROP_OLDEST
+        self.on_backpressure = on_backpressure  # on_backpressure(paused: bool)
+
+        self._chunks = deque()  # read-only memoryviews, oldest first
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self.paused = False
+
+        self.queued_frames = 0
+        self.queued_bytes = 0
+        self.sent_chunks = 0
+        self.sent_bytes = 0
+        self.coalesced_frames = 0
+        self.dropped_bytes = 0
+        self.pauses = 0
+        self.peak_buffer_bytes = 0
+
+    def put(self, pcm):
+        """Queue a (sample-aligned) frame; returns False if it was refused"""
+        if self._closed:
+            return False
+
+        pcm = memoryview(pcm).cast("B")
+        if not pcm.readonly:
+            # The caller may reuse a mutable buffer; only those frames are copied
+            pcm = memoryview(bytes(pcm))
+        notify_pause = refused = False
+        with self._lock:
+            size = len(pcm)
+            overflow = self._buffered + size - self.max_buffer_bytes
+            if overflow > 0 and self.policy == POLICY_PAUSE:
+                # Every frame refused while full is reported, not just the one that paused the client
+                refused = True
+                self.dropped_bytes += size
+                if not self.paused:
+                    self.paused = notify_pause = True
+                    self.pauses += 1
+                _add_totals(dropped_bytes=size)
+            else:
+                if overflow > 0:
+                    # Keep the newest audio; the oldest is already stale for live transcription
+                    if size > self.max_buffer_bytes:
+                        pcm = pcm[size - self.max_buffer_bytes:]
+                    self._discard(overflow - (size - len(pcm)))
+                    self.dropped_bytes += overflow
+                    _add_totals(dropped_bytes=overflow)
+                self._chunks.append(pcm)
+                self._buffered += len(pcm)
+                self.queued_frames += 1
+                self.queued_bytes += size
+                self.peak_buffer_bytes = max(self.peak_buffer_bytes, self._buffered)
+                _add_totals(queued_bytes=size)
+
+        if notify_pause:
+            print(f"⏸️ Audio queue full ({self.max_buffer_bytes} bytes), pausing client")
+            self._notify(True)
+        if refused:
+            return False
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def _discard(self, size):
+        """Drop size bytes from the front; called with _lock held"""
+        while size > 0 and self._chunks:
+            head = self._chunks[0]
+            if len(head) <= size:
+                self._chunks.popleft()
+                cut = len(head)
+            else:
+                self._chunks[0] = head[size:]
+                cut = size
+            self._buffered -= cut
+            size -= cut
+
+    def _pop(self, size):
+        """Remove up to size bytes from the front as a list of memoryviews; called with _lock held"""
+        pieces = []
+        while size > 0 and self._chunks:
+            head = self._chunks[0]
+            if len(head) <= size:
+                pieces.append(self._chunks.popleft())
+            else:
+                pieces.append(head[:size])
+                self._chunks[0] = head[size:]
+            size -= len(pieces[-1])
+            self._buffered -= len(pieces[-1])
+        return pieces
+
+    def _take(self, flush):
+        with self._lock:
+            available = self._buffered
+            if not available or (available < self.min_chunk_bytes and not flush):
+                return None, False
+            head = len(self._chunks[0])
+            if head >= self.min_chunk_bytes:
+                # Already a full chunk on its own: forward (a slice of) it without copying
+                pieces = self._pop(min(head, self.max_chunk_bytes))
+                chunk = pieces[0]
+            else:
+                pieces = self._pop(min(available, self.max_chunk_bytes))
+                chunk = b"".join(pieces) if len(pieces) > 1 else pieces[0]
+            size = len(chunk)
+
+            self.sent_chunks += 1
+            self.sent_bytes += size
+            # Frames merged into a chunk beyond the first count as coalesced
+            if len(pieces) > 1:
+                self.coalesced_frames += len(pieces) - 1
+                _add_totals(coalesced_frames=len(pieces) - 1)
+            _add_totals(sent_bytes=size, sent_chunks=1)
+
+            resume = self.paused and self._buffered <= self.max_buffer_bytes // 2
+            if resume:
+                self.paused = False
+            return chunk, resume
+
+    async def drain(self, send):
+        """Send coalesced chunks with send(chunk) until close(); runs on the stream's loop"""
+        while not self._closed:
+            chunk, resume = self._take(flush=False)
+            if chunk is None:
+                self._wakeup.clear()
+                try:
+                    # Short wait for more frames, then flush a partial chunk so latency stays bounded
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_after)
+                    continue
+                except asyncio.TimeoutError:
+                    chunk, resume = self._take(flush=True)
+                    if chunk is None:
+                        self._wakeup.clear()
+                        await self._wakeup.wait()
+                        continue
+            if resume:
+                print("▶️ Audio queue drained, resuming client")
+                self._notify(False)
+            await send(chunk)
+
+    def close(self):
+        self._closed = True
+        try:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _notify(self, paused):
+        if self.on_backpressure:
+            try:
+                self.on_backpressure(paused)
+            except Exception as e:
+                print(f"Error sending backpressure signal: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "buffered_bytes": self._buffered,
+                "peak_buffer_bytes": self.peak_buffer_bytes,
+                "queued_frames": self.queued_frames,
+                "queued_bytes": self.queued_bytes,
+                "sent_chunks": self.sent_chunks,
+                "sent_bytes": self.sent_bytes,
+                "coalesced_frames": self.coalesced_frames,
+                "dropped_bytes": self.dropped_bytes,
+                "pauses": self.pauses,
+                "paused": self.paused,
+            }
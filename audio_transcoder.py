@@ -0,0 +1,153 @@
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+ENCODINGS = {"pcm_s16le": np.dtype("<i2"), "pcm_f32le": np.dtype("<f4")}
+# Filter size grows with the reduced up/down factors, so only common capture rates are accepted
+SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000, 96000)
+
+
+def parse_audio_format(options):
+    """Validate the client's declared format: {sample_rate, channels, encoding}"""
+    options = options or {}
+    sample_rate = int(options.get("sample_rate", TARGET_SAMPLE_RATE))
+    channels = int(options.get("channels", 1))
+    encoding = str(options.get("encoding", "pcm_s16le")).lower()
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding {encoding!r}; expected one of {', '.join(ENCODINGS)}")
+    if sample_rate not in SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample rate {sample_rate}; expected one of "
+                         f"{', '.join(map(str, SAMPLE_RATES))}")
+    if channels not in (1, 2):
+        raise ValueError(f"Unsupported channel count {channels}")
+    return {"sample_rate": sample_rate, "channels": channels, "encoding": encoding}
+
+
+@lru_cache(maxsize=None)
+def design_filter(up, down, zero_crossings=16, beta=8.0):
+    """Kaiser-windowed sinc low-pass for rational resampling, split into `up` polyphase rows.
+
+    Cached per (up, down) and shared read-only by every session at that rate.
+    """
+    factor = max(up, down)
+    cutoff = 0.475 / factor  # just under the lower Nyquist, in upsampled-rate cycles/sample
+    half = zero_crossings * factor
+    n = np.arange(-half, half + 1)
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(len(n), beta) * up
+
+    phase_len = -(-len(taps) // up)
+    padded = np.zeros(phase_len * up)
+    padded[:len(taps)] = taps
+    # phases[p, j] = taps[p + j * up]
+    phases = padded.reshape(phase_len, up).T.astype(np.float32)
+    phases.flags.writeable = False
+    return phases
+
+
+class StreamingTranscoder:
+    """Client PCM (any rate, mono/stereo, s16/f32) -> 16 kHz mono pcm_s16le, one frame at a time.
+
+    Filter history carries across frames, so chunk boundaries are seamless. Work buffers are
+    reused between frames and gather indices are cached per frame shape, so steady-state
+    frames only allocate the returned bytes.
+    """
+
+    def __init__(self, sample_rate, channels=1, encoding="pcm_s16le", target_rate=TARGET_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = ENCODINGS[encoding]
+        self.bytes_per_frame = self.dtype.itemsize * channels
+        divisor = gcd(sample_rate, target_rate)
+        self.up = target_rate // divisor
+        self.down = sample_rate // divisor
+        self.resampling = self.up != self.down
+
+        if self.resampling:
+            self.phases = design_filter(self.up, self.down)
+            self.phase_len = self.phases.shape[1]
+        else:
+            self.phase_len = 1
+        self._history = self.phase_len - 1
+        self._buffer = np.zeros(self._history + 4096, dtype=np.float32)  # [history | new samples]
+        self._t = 0  # upsampled position of the next output, relative to the first new sample
+        self._plans = {}  # (t, n_new) -> gather plan, reused for steady frame sizes
+        self._out = np.zeros(0, dtype=np.float32)
+        self._out_i16 = np.zeros(0, dtype=np.int16)
+
+    @property
+    def passthrough(self):
+        return not self.resampling and self.channels == 1 and self.dtype == ENCODINGS["pcm_s16le"]
+
+    def _ensure(self, n_new):
+        needed = self._history + n_new
+        if len(self._buffer) < needed:
+            grown = np.zeros(needed, dtype=np.float32)
+            grown[:self._history] = self._buffer[:self._history]
+            self._buffer = grown
+
+    def _plan(self, n_new):
+        key = (self._t, n_new)
+        plan = self._plans.get(key)
+        if plan is None:
+            # Outputs whose newest tap falls inside this frame
+            count = max(0, -(-(n_new * self.up - self._t) // self.down))
+            positions = self._t + self.down * np.arange(count)
+            newest = positions // self.up + self._history
+            index = newest[:, None] - np.arange(self.phase_len)[None, :]
+            coefficients = self.phases[positions % self.up]
+            next_t = self._t + count * self.down - n_new * self.up
+            plan = (index, coefficients, np.empty(index.shape, dtype=np.float32), next_t)
+            if len(self._plans) < 64:
+                self._plans[key] = plan
+        return plan
+
+    def process(self, data):
+        """Transcode one frame of client bytes; returns 16 kHz mono pcm_s16le bytes"""
+        if self.passthrough:
+            return bytes(data)
+        samples = np.frombuffer(data, dtype=self.dtype)
+        n_new = len(samples) // self.channels
+        if not n_new:
+            return b""
+        self._ensure(n_new)
+        new = self._buffer[self._history:self._history + n_new]
+
+        # Downmix and normalize into the work buffer without temporaries
+        if self.channels == 2:
+            frames = samples[:n_new * 2].reshape(n_new, 2)
+            np.add(frames[:, 0], frames[:, 1], out=new)
+            scale = 0.5
+        else:
+            new[:] = samples[:n_new]
+            scale = 1.0
+        if self.dtype == ENCODINGS["pcm_s16le"]:
+            scale /= 32768.0
+        if scale != 1.0:
+            new *= scale
+
+        if self.resampling:
+            index, coefficients, window, next_t = self._plan(n_new)
+            count = len(index)
+            if len(self._out) < count:
+                self._out = np.zeros(count, dtype=np.float32)
+            out = self._out[:count]
+            np.take(self._buffer, index, out=window)
+            np.einsum("kl,kl->k", window, coefficients, out=out)
+            self._t = next_t
+            # Keep the newest samples as history for the next frame
+            if self._history:
+                self._buffer[:self._history] = self._buffer[n_new:n_new + self._history]
+        else:
+            out = new
+            count = n_new
+
+        if len(self._out_i16) < count:
+            self._out_i16 = np.zeros(count, dtype=np.int16)
+        pcm = self._out_i16[:count]
+        np.clip(out, -1.0, 32767 / 32768, out=out)
+        out *= 32768.0
+        np.rint(out, out=out)
+        np.copyto(pcm, out, casting="unsafe")
+        return pcm.astype("<i2", copy=False).tobytes()
@@ -0,0 +1,173 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+LOG_INSERT_SQL = """
+INSERT INTO logs (table_name, operation, record_id, data_before, data_after, user_context)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """Background writer that batches audit rows into `logs` with executemany"""
+
+    def __init__(self, db, max_queue=None, batch_size=None, flush_interval=None, overflow_policy=None):
+        self.db = db
+        self.batch_size = batch_size or int(os.getenv("AUDIT_LOG_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval or float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1.0"))
+        self.overflow_policy = (overflow_policy or os.getenv("AUDIT_LOG_OVERFLOW", OVERFLOW_BLOCK)).lower()
+        if self.overflow_policy not in (OVERFLOW_BLOCK, OVERFLOW_DROP):
+            print(f"Unknown AUDIT_LOG_OVERFLOW policy '{self.overflow_policy}', using '{OVERFLOW_BLOCK}'")
+            self.overflow_policy = OVERFLOW_BLOCK
+        self.queue = queue.Queue(maxsize=max_queue or int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000")))
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, row):
+        """Queue one row tuple; returns False if it was dropped"""
+        if self._closed:
+            return False
+        if self.overflow_policy == OVERFLOW_BLOCK:
+            self.queue.put(row)
+        else:
+            try:
+                self.queue.put_nowait(row)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+                return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Drain whatever is still queued on shutdown
+        remaining = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        for i in range(0, len(remaining), self.batch_size):
+            self._flush(remaining[i:i + self.batch_size])
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            with self.db.get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.executemany(LOG_INSERT_SQL, batch)
+                if not connection.autocommit:
+                    connection.commit()
+                cursor.close()
+            with self._lock:
+                self.written += len(batch)
+        except Exception as e:
+            print(f"Error flushing {len(batch)} audit log rows: {e}")
+            with self._lock:
+                self.failed += len(batch)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.batches += 1
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                self.total_flush_seconds += elapsed
+
+    def close(self, timeout=10.0):
+        """Flush queued rows and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread and self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                print(f"Audit log writer did not finish flushing ({self.queue.qsize()} rows left)")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_flush_ms": self.last_flush_seconds * 1000,
+                "max_flush_ms": self.max_flush_seconds * 1000,
+                "avg_flush_ms": (self.total_flush_seconds / self.batches * 1000) if self.batches else 0.0,
+            }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_log_writer(db):
+    """Process-wide writer, started on first use and flushed at interpreter exit"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter(db)
+                _writer.start()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def shutdown_audit_log_writer():
+    if _writer is not None:
+        _writer.close()
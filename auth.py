@@ -0,0 +1,48 @@
+import os
+import secrets
+
+import bcrypt
+from eventlet import tpool
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+_serializer = None
+
+
+def hash_password(password):
+    """bcrypt hash on eventlet's native thread pool so the hub keeps serving sockets"""
+    return tpool.execute(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+
+
+def check_password(password, hashed):
+    if isinstance(hashed, str):
+        hashed = hashed.encode('utf-8')
+    return tpool.execute(bcrypt.checkpw, password.encode('utf-8'), bytes(hashed))
+
+
+def _get_serializer():
+    global _serializer
+    if _serializer is None:
+        secret = os.getenv("SESSION_SECRET_KEY")
+        if not secret:
+            # Tokens will not survive a restart or work across workers without a configured key
+            print("⚠️ SESSION_SECRET_KEY not set, using a random per-process key")
+            secret = secrets.token_urlsafe(32)
+        _serializer = URLSafeTimedSerializer(secret, salt="petcare-session")
+    return _serializer
+
+
+def issue_session_token(user_id):
+    """Signed, timestamped token carrying the user id"""
+    return _get_serializer().dumps({"user_id": user_id})
+
+
+def verify_session_token(token):
+    """Return the user id for a valid token, else None (HMAC check only, no bcrypt)"""
+    if not token:
+        return None
+    max_age = int(os.getenv("SESSION_TOKEN_MAX_AGE", str(7 * 24 * 3600)))
+    try:
+        payload = _get_serializer().loads(token, max_age=max_age)
+    except (SignatureExpired, BadSignature):
+        return None
+    return payload.get("user_id") if isinstance(payload, dict) else None
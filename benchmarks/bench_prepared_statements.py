@@ -0,0 +1,136 @@
+"""Micro-benchmark: text protocol vs. server-side prepared statements for the hot queries.
+
+Needs a reachable MySQL (MYSQL_DBHOST / MYSQL_USER / MYSQL_PASSWORD / MYSQL_DBNAME).
+Creates and drops its own scratch tables, so point it at a local/dev database.
+
+    python benchmarks/bench_prepared_statements.py [--iterations 5000] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from prepared_statements import StatementRegistry, insert_sql
+
+SETUP = [
+    "DROP TABLE IF EXISTS bench_pet_profile",
+    "DROP TABLE IF EXISTS bench_logs",
+    """CREATE TABLE bench_pet_profile (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100), owner INT, breed VARCHAR(100), age VARCHAR(50),
+        INDEX (owner)
+    )""",
+    """CREATE TABLE bench_logs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        table_name VARCHAR(64), operation VARCHAR(16), record_id INT,
+        data_before JSON, data_after JSON, user_context VARCHAR(64)
+    )""",
+]
+TEARDOWN = ["DROP TABLE IF EXISTS bench_pet_profile", "DROP TABLE IF EXISTS bench_logs"]
+
+SELECT_PETS = "SELECT * FROM bench_pet_profile WHERE owner = %s ORDER BY id"
+LOG_INSERT = """
+INSERT INTO bench_logs (table_name, operation, record_id, data_before, data_after, user_context)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.getenv("MYSQL_DBHOST"),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD"),
+        database=os.getenv("MYSQL_DBNAME"),
+        charset='utf8mb4',
+        autocommit=True,
+    )
+
+
+def _text_query(connection, sql, params, fetch):
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    if fetch:
+        cursor.fetchall()
+    cursor.close()
+
+
+def _insert_text_sql(table_name, columns):
+    # What insert_data did before: rebuild the statement text on every call
+    placeholders = ', '.join(['%s'] * len(columns))
+    return f"INSERT INTO `{table_name}` ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def run_case(name, iterations, fn):
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    return {"case": name, "iterations": iterations, "us_per_query": elapsed / iterations * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    load_dotenv()
+
+    connection = connect()
+    setup = connection.cursor()
+    for statement in SETUP:
+        setup.execute(statement)
+    setup.executemany(
+        "INSERT INTO bench_pet_profile (name, owner, breed, age) VALUES (%s, %s, %s, %s)",
+        [(f"pet{i}", i % 50, "Beagle", "2 years") for i in range(500)],
+    )
+    setup.close()
+
+    registry = StatementRegistry(enabled=True)
+    pet = {"name": "Bella", "owner": 1, "breed": "Shih Tzu", "age": "2 years"}
+    log_row = ("bench_pet_profile", "INSERT", 1, None, json.dumps(pet), "bench")
+    n = args.iterations
+
+    def prepared_select(i):
+        registry.execute(connection, SELECT_PETS, (i % 50,)).fetchall()
+
+    def prepared_insert(i):
+        registry.execute(connection, insert_sql("bench_pet_profile", tuple(pet)), tuple(pet.values()))
+
+    results = [
+        run_case("select_pets/text", n, lambda i: _text_query(connection, SELECT_PETS, (i % 50,), True)),
+        run_case("select_pets/prepared", n, prepared_select),
+        run_case("insert_pet/text", n, lambda i: _text_query(
+            connection, _insert_text_sql("bench_pet_profile", list(pet)), list(pet.values()), False)),
+        run_case("insert_pet/prepared", n, prepared_insert),
+        run_case("log_insert/text", n, lambda i: _text_query(connection, LOG_INSERT, log_row, False)),
+        run_case("log_insert/prepared", n, lambda i: registry.execute(connection, LOG_INSERT, log_row)),
+    ]
+
+    teardown = connection.cursor()
+    for statement in TEARDOWN:
+        teardown.execute(statement)
+    teardown.close()
+    connection.close()
+
+    by_case = {r["case"]: r["us_per_query"] for r in results}
+    for query in ("select_pets", "insert_pet", "log_insert"):
+        text, prepared = by_case[f"{query}/text"], by_case[f"{query}/prepared"]
+        results.append({"case": f"{query}/saving", "us_per_query": text - prepared,
+                        "percent": (text - prepared) / text * 100 if text else 0.0})
+
+    if args.json:
+        print(json.dumps({"results": results, "registry": registry.get_stats()}, indent=2))
+        return
+    for r in results:
+        extra = f" ({r['percent']:.1f}%)" if "percent" in r else ""
+        print(f"{r['case']:<24} {r['us_per_query']:>10.1f} us{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Throughput of StreamingTranscoder: client frames transcoded per second on one core.
+
+Feeds --seconds of generated audio per format in --frame-ms frames through a single
+transcoder (one thread, so the numbers are per core) and reports frames/s and the real-time
+factor (audio seconds processed per wall-clock second).
+
+    python benchmarks/bench_transcoder.py [--seconds 60] [--frame-ms 20] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from audio_transcoder import StreamingTranscoder
+
+FORMATS = [
+    (48000, 2, "pcm_f32le"),  # typical desktop browser capture
+    (48000, 1, "pcm_f32le"),
+    (44100, 2, "pcm_f32le"),
+    (44100, 1, "pcm_s16le"),
+    (16000, 1, "pcm_f32le"),  # conversion only
+    (16000, 1, "pcm_s16le"),  # passthrough baseline
+]
+
+
+def make_frames(sample_rate, channels, encoding, seconds, frame_ms):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.default_rng(0).standard_normal(len(t))
+    if channels == 2:
+        signal = np.stack([signal, signal * 0.8], axis=1).ravel()
+    if encoding == "pcm_f32le":
+        data = signal.astype("<f4").tobytes()
+        sample_bytes = 4
+    else:
+        data = (signal * 32767).astype("<i2").tobytes()
+        sample_bytes = 2
+    step = sample_rate * frame_ms // 1000 * channels * sample_bytes
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+
+def run_case(sample_rate, channels, encoding, seconds, frame_ms):
+    frames = make_frames(sample_rate, channels, encoding, seconds, frame_ms)
+    transcoder = StreamingTranscoder(sample_rate, channels, encoding)
+    for frame in frames[:50]:  # warm up the gather plans
+        transcoder.process(frame)
+
+    started = time.perf_counter()
+    for frame in frames:
+        transcoder.process(frame)
+    elapsed = time.perf_counter() - started
+    return {
+        "format": f"{sample_rate}Hz/{channels}ch/{encoding}",
+        "frames": len(frames),
+        "frames_per_second": len(frames) / elapsed,
+        "us_per_frame": elapsed / len(frames) * 1e6,
+        "realtime_factor": seconds / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--frame-ms", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = [run_case(rate, channels, encoding, args.seconds, args.frame_ms)
+               for rate, channels, encoding in FORMATS]
+
+    if args.json:
+        print(json.dumps({"frame_ms": args.frame_ms, "numpy": np.__version__, "results": results}, indent=2))
+        return
+    for r in results:
+        print(f"{r['format']:<26} {r['frames_per_second']:>10.0f} frames/s  "
+              f"{r['us_per_frame']:>7.1f} us/frame  {r['realtime_factor']:>8.0f}x realtime")
+
+
+if __name__ == "__main__":
+    main()
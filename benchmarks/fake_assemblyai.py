@@ -0,0 +1,116 @@
+"""Local stand-in for AssemblyAI's v3 streaming websocket, for offline load tests.
+
+Speaks the Begin / Turn / Termination messages SpeechProcessor handles. Audio is counted, not
+recognized: a partial Turn is sent every --partial-ms of audio, and once the client stops
+sending for --end-of-turn-ms the final Turn (end_of_turn=true) carries the full --transcript.
+
+    python benchmarks/fake_assemblyai.py [--port 8082] [--transcript "..."]
+    ASSEMBLYAI_WS_URL=ws://127.0.0.1:8082/v3/ws python main.py
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+BYTES_PER_SECOND = 32000  # 16 kHz pcm_s16le mono
+
+
+def turn_message(turn_order, words, end_of_turn):
+    return json.dumps({
+        "type": "Turn",
+        "turn_order": turn_order,
+        "end_of_turn": end_of_turn,
+        "turn_is_formatted": end_of_turn,
+        "transcript": " ".join(words),
+        "words": [{"text": word, "confidence": 0.95, "word_is_final": end_of_turn} for word in words] or
+                 [{"text": "", "confidence": 0.0, "word_is_final": False}],
+    })
+
+
+def audio_bytes(message):
+    if isinstance(message, (bytes, bytearray)):
+        return len(message)
+    # Legacy clients send base64 text frames; control messages are JSON
+    if message.lstrip().startswith("{"):
+        return None
+    try:
+        return len(base64.b64decode(message))
+    except ValueError:
+        return 0
+
+
+async def handle_session(websocket, args):
+    words = args.transcript.split()
+    bytes_per_partial = BYTES_PER_SECOND * args.partial_ms / 1000
+    await asyncio.sleep(args.connect_ms / 1000)
+    await websocket.send(json.dumps({"type": "Begin", "id": str(uuid.uuid4()),
+                                     "expires_at": int(time.time()) + 3600}))
+
+    turn_order = 0
+    turn_bytes = 0
+    partials_sent = 0
+    total_bytes = 0
+    while True:
+        try:
+            if turn_bytes:
+                message = await asyncio.wait_for(websocket.recv(), timeout=args.end_of_turn_ms / 1000)
+            else:
+                message = await websocket.recv()
+        except asyncio.TimeoutError:
+            # Silence after speech: endpoint the turn
+            await asyncio.sleep(args.final_ms / 1000)
+            await websocket.send(turn_message(turn_order, words, True))
+            turn_order += 1
+            turn_bytes = partials_sent = 0
+            continue
+        except ConnectionClosed:
+            break
+
+        size = audio_bytes(message)
+        if size is None:
+            if json.loads(message).get("type") == "Terminate":
+                break
+            continue
+        turn_bytes += size
+        total_bytes += size
+        if turn_bytes >= (partials_sent + 1) * bytes_per_partial:
+            partials_sent += 1
+            # Partials never carry the whole sentence, so clients can spot the final by its text
+            await websocket.send(turn_message(turn_order, words[:min(partials_sent, len(words) - 1)], False))
+
+    try:
+        await websocket.send(json.dumps({"type": "Termination",
+                                         "audio_duration_seconds": total_bytes / BYTES_PER_SECOND}))
+    except ConnectionClosed:
+        pass
+
+
+async def run(args):
+    async with serve(lambda ws: handle_session(ws, args), args.host, args.port, max_size=2 ** 20):
+        print(f"🎙️ Fake AssemblyAI listening on ws://{args.host}:{args.port}/v3/ws")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--transcript", default="Max has been vomiting since this morning, what should I do?")
+    parser.add_argument("--partial-ms", type=float, default=500, help="audio per partial Turn")
+    parser.add_argument("--end-of-turn-ms", type=float, default=400, help="silence that ends a turn")
+    parser.add_argument("--final-ms", type=float, default=100, help="extra delay before the final Turn")
+    parser.add_argument("--connect-ms", type=float, default=0, help="delay before Begin")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
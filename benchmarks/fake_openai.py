@@ -0,0 +1,160 @@
+"""Local stand-in for api.openai.com/v1/chat/completions, for offline load tests.
+
+Replies are picked from the prompt, so intent classification, field extraction and HEALTH
+answers all follow their real paths. Supports "stream": true (SSE) with per-token pacing.
+
+    python benchmarks/fake_openai.py [--port 8081] [--latency-ms 300] [--token-ms 20] [--tokens 40]
+    OPENAI_API_URL=http://127.0.0.1:8081/v1/chat/completions python main.py
+
+GET /stats returns request counts as JSON.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_WORDS = ("Keep an eye on appetite, water intake and energy over the next day. Mild stomach upsets "
+                "often settle with a bland diet, but persistent vomiting, lethargy or blood are reasons to "
+                "call your veterinarian promptly.").split()
+
+HEALTH_FIELDS = {"pet_name": None, "query_category": "digestive", "symptoms": "vomiting", "urgency": "low"}
+CARE_FIELDS = {"pet_name": None, "care_type": "feeding", "description": "Breakfast", "frequency": "daily",
+               "time_of_day": "08:00"}
+
+
+def pick_reply(prompt, intent):
+    """Reply shaped like what the real model returns for this template"""
+    if "in the same reply, extract the fields" in prompt:
+        fields = CARE_FIELDS if intent == "CARE_ROUTINE" else HEALTH_FIELDS
+        return json.dumps({"intent": intent, "fields": fields})
+    if "determine their intent" in prompt:
+        return intent
+    if "Extract care routine" in prompt:
+        return json.dumps(CARE_FIELDS)
+    if "Extract" in prompt:
+        return json.dumps(HEALTH_FIELDS)
+    return None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.streamed = 0
+
+    def record(self, streamed):
+        with self.lock:
+            self.requests += 1
+            self.streamed += int(streamed)
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "streamed": self.streamed}
+
+
+def make_handler(args, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, stats.snapshot())
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.startswith("/v1/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+            stream = bool(payload.get("stream"))
+            stats.record(stream)
+
+            if args.error_rate and random.random() < args.error_rate:
+                self._send_json(503, {"error": {"message": "overloaded"}})
+                return
+
+            # Jittered time to first byte
+            time.sleep(max(0.0, random.gauss(args.latency_ms, args.jitter_ms)) / 1000)
+            reply = pick_reply(prompt, args.intent)
+            if reply is not None:
+                tokens = [reply]
+            else:
+                tokens = [word + " " for word in (ANSWER_WORDS * 4)[:args.tokens]]
+
+            if not stream:
+                if len(tokens) > 1:
+                    time.sleep(args.token_ms * len(tokens) / 1000)
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                                 "finish_reason": "stop"}],
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(args.token_ms / 1000)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, text):
+            data = text.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive sockets is expected under load
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=300, help="mean time to first byte")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--token-ms", type=float, default=20, help="delay between streamed tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="length of free-form answers")
+    parser.add_argument("--intent", default="HEALTH", help="intent returned by classification prompts")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    args = parser.parse_args()
+
+    server = QuietServer((args.host, args.port), make_handler(args, Stats()))
+    print(f"🤖 Fake OpenAI listening on http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
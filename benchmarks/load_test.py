@@ -0,0 +1,243 @@
+"""Socket.IO load generator: N concurrent clients streaming PCM through a full voice turn.
+
+Each client connects, calls start_audio_stream, streams --audio-seconds of 16 kHz pcm_s16le in
+real time via audio_data, waits for the final transcription, sends stop_audio_stream and waits
+for ai_response (with --auto-turn the server processes the final transcript itself and no
+stop_audio_stream is sent). Run the server against the local fakes for vendor-free numbers:
+
+    python benchmarks/fake_openai.py &
+    python benchmarks/fake_assemblyai.py &
+    OPENAI_API_URL=http://127.0.0.1:8081/v1/chat/completions \\
+    ASSEMBLYAI_WS_URL=ws://127.0.0.1:8082/v3/ws python main.py &
+    python benchmarks/load_test.py --clients 20 --turns 3 --binary --output results.json
+
+Stages (ms): connect, stream_start (start_audio_stream ack), transcript (last audio frame ->
+final transcription), first_token (stop_audio_stream -> first ai_response_delta, with
+--stream-responses), response (stop_audio_stream, or the final transcription with --auto-turn,
+-> ai_response) and end_to_end (last audio
+frame -> ai_response). Install websocket-client to use the websocket transport instead of polling.
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from array import array
+
+import socketio
+
+STAGES = ("connect", "stream_start", "transcript", "first_token", "response", "end_to_end")
+SAMPLE_RATE = 16000
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1],
+    }
+
+
+def tone_frames(seconds, frame_ms):
+    """A quiet 220 Hz tone cut into frame_ms pcm_s16le frames"""
+    samples = array("h", (int(3000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE))
+                          for i in range(int(SAMPLE_RATE * seconds))))
+    if sys.byteorder != "little":
+        samples.byteswap()
+    pcm = samples.tobytes()
+    frame_bytes = SAMPLE_RATE * 2 * frame_ms // 1000
+    return [pcm[i:i + frame_bytes] for i in range(0, len(pcm), frame_bytes)]
+
+
+class VirtualUser:
+    def __init__(self, index, args, frames, results, lock):
+        self.index = index
+        self.args = args
+        self.frames = frames
+        self.results = results
+        self.lock = lock
+        self.client = socketio.Client(reconnection=False)
+        self.transcript_event = threading.Event()
+        self.response_event = threading.Event()
+        self.turn_started = None
+        self.first_token_at = None
+        self.response_text = None
+
+        @self.client.on("transcription")
+        def on_transcription(data):
+            if (data or {}).get("text", "").strip() == args.transcript.strip():
+                self.transcript_event.set()
+
+        @self.client.on("ai_response_delta")
+        def on_delta(data):
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+
+        @self.client.on("ai_response")
+        def on_response(data):
+            self.response_text = (data or {}).get("text")
+            self.response_event.set()
+
+    def _record(self, turn):
+        with self.lock:
+            self.results.append(turn)
+
+    def run(self):
+        auth = {"token": self.args.token} if self.args.token else None
+        started = time.perf_counter()
+        try:
+            self.client.connect(self.args.url, auth=auth, wait_timeout=self.args.timeout)
+        except Exception as e:
+            self._record({"client": self.index, "ok": False, "error": f"connect: {e}"})
+            return
+        connect_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            started = time.perf_counter()
+            self.client.call("start_audio_stream", {"binary_audio": self.args.binary,
+                                                     "stream_responses": self.args.stream_responses,
+                                                     "vad": self.args.vad,
+                                                     "auto_turn": self.args.auto_turn,
+                                                     "speculative_intent": self.args.speculative_intent,
+                                                     "id": self.args.user_id},
+                             timeout=self.args.timeout)
+            stream_start_ms = (time.perf_counter() - started) * 1000
+
+            for turn_index in range(self.args.turns):
+                turn = self._run_turn(turn_index)
+                if turn_index == 0:
+                    turn["connect"] = connect_ms
+                    turn["stream_start"] = stream_start_ms
+                self._record(turn)
+                if not turn["ok"]:
+                    break
+        except Exception as e:
+            self._record({"client": self.index, "ok": False, "error": str(e)})
+        finally:
+            self.client.disconnect()
+
+    def _run_turn(self, turn_index):
+        turn = {"client": self.index, "turn": turn_index, "ok": False}
+        self.transcript_event.clear()
+        self.response_event.clear()
+        self.first_token_at = None
+
+        frame_interval = self.args.frame_ms / 1000
+        next_send = time.perf_counter()
+        for frame in self.frames:
+            payload = frame if self.args.binary else base64.b64encode(frame).decode("ascii")
+            self.client.emit("audio_data", payload)
+            # Pace like a live microphone
+            next_send += frame_interval
+            time.sleep(max(0.0, next_send - time.perf_counter()))
+        audio_done = time.perf_counter()
+
+        if not self.transcript_event.wait(self.args.timeout):
+            turn["error"] = "timeout waiting for transcription"
+            return turn
+        transcript_at = time.perf_counter()
+
+        stop_at = time.perf_counter()
+        if not self.args.auto_turn:
+            self.client.emit("stop_audio_stream", {"text": self.args.transcript, "id": self.args.user_id})
+        if not self.response_event.wait(self.args.timeout):
+            turn["error"] = "timeout waiting for ai_response"
+            return turn
+        response_at = time.perf_counter()
+
+        turn.update({
+            "ok": not (self.response_text or "").startswith("Error"),
+            "transcript": (transcript_at - audio_done) * 1000,
+            "response": (response_at - stop_at) * 1000,
+            "end_to_end": (response_at - audio_done) * 1000,
+        })
+        if self.first_token_at is not None:
+            turn["first_token"] = (self.first_token_at - stop_at) * 1000
+        if not turn["ok"]:
+            turn["error"] = self.response_text
+        return turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:9000")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=1, help="voice turns per client")
+    parser.add_argument("--ramp-seconds", type=float, default=1.0, help="spread client starts over this long")
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--binary", action="store_true", help="send raw PCM frames instead of base64 text")
+    parser.add_argument("--stream-responses", action="store_true")
+    parser.add_argument("--vad", action="store_true", help="ask the server to suppress silence upstream")
+    parser.add_argument("--auto-turn", action="store_true", help="let the server process end-of-turn transcripts")
+    parser.add_argument("--speculative-intent", action="store_true",
+                        help="let the server classify partial transcripts before the turn ends")
+    parser.add_argument("--transcript", default="Max has been vomiting since this morning, what should I do?",
+                        help="must match the fake AssemblyAI --transcript")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--token", default=os.getenv("LOAD_TEST_TOKEN"), help="session token from /api/auth/login")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--label", default="", help="free-form tag stored with the results")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    frames = tone_frames(args.audio_seconds, args.frame_ms)
+    results = []
+    lock = threading.Lock()
+    users = [VirtualUser(i, args, frames, results, lock) for i in range(args.clients)]
+    threads = [threading.Thread(target=user.run, daemon=True) for user in users]
+
+    started = time.perf_counter()
+    for i, thread in enumerate(threads):
+        thread.start()
+        if args.clients > 1:
+            time.sleep(args.ramp_seconds / (args.clients - 1) if i < args.clients - 1 else 0)
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    completed = [turn for turn in results if turn.get("ok")]
+    errors = [turn["error"] for turn in results if not turn.get("ok") and turn.get("error")]
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("token", "output")},
+        "wall_seconds": wall_seconds,
+        "turns": {"completed": len(completed), "failed": len(results) - len(completed)},
+        "throughput_turns_per_second": len(completed) / wall_seconds if wall_seconds else 0.0,
+        "stages_ms": {stage: summarize([turn[stage] for turn in results if stage in turn]) for stage in STAGES},
+        "errors": sorted(set(errors))[:20],
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        e2e = report["stages_ms"]["end_to_end"]
+        print(f"{len(completed)} turns ok, {report['turns']['failed']} failed, "
+              f"{report['throughput_turns_per_second']:.2f} turns/s, "
+              f"end_to_end p50={e2e.get('p50')} p95={e2e.get('p95')} p99={e2e.get('p99')} ms -> {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
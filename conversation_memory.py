@@ -0,0 +1,127 @@
+import math
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+# Words that say nothing about which earlier question is relevant
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "my", "me", "i", "it", "to", "of", "and", "or", "for",
+    "in", "on", "with", "what", "should", "do", "does", "can", "has", "have", "be", "he", "she",
+    "his", "her", "this", "that", "so", "very", "much", "about",
+}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English)"""
+    return math.ceil(len(text or "") / 4)
+
+
+def _keywords(text):
+    return {word for word in _WORD_RE.findall((text or "").lower()) if word not in _STOPWORDS}
+
+
+class PetConversationMemory:
+    """Bounded per-pet window of earlier HEALTH exchanges, backed by the health_queries log"""
+
+    def __init__(self, db, window=None, max_pets=None, recency_weight=0.4):
+        self.db = db
+        self.window = window if window is not None else int(os.getenv("PET_MEMORY_WINDOW", "20"))
+        self.max_pets = max_pets if max_pets is not None else int(os.getenv("PET_MEMORY_MAX_PETS", "5000"))
+        self.recency_weight = recency_weight
+        self._pets = OrderedDict()  # pet_id -> deque of turns, oldest first
+        self._lock = threading.Lock()
+        self.selected = 0
+        self.dropped = 0
+
+    def _history(self, pet_id):
+        with self._lock:
+            turns = self._pets.get(pet_id)
+            if turns is not None:
+                self._pets.move_to_end(pet_id)
+                return turns
+
+        # Cold pet: warm the window from the log table once
+        rows = self.db.get_recent_health_queries(pet_id, self.window) or []
+        turns = deque(
+            ({"query": row.get("query_text", ""), "answer": row.get("response_summary", ""),
+              "category": row.get("query_category")} for row in reversed(rows)),
+            maxlen=self.window,
+        )
+        with self._lock:
+            turns = self._pets.setdefault(pet_id, turns)
+            self._pets.move_to_end(pet_id)
+            while len(self._pets) > self.max_pets:
+                self._pets.popitem(last=False)
+        return turns
+
+    def remember(self, pet_id, query, answer, category=None):
+        if pet_id is None:
+            return
+        turns = self._history(pet_id)
+        with self._lock:
+            turns.append({"query": query, "answer": answer, "category": category})
+
+    def select_context(self, pet_id, query, token_budget):
+        """Earlier turns ranked by relevance to query and recency, fitted into token_budget.
+
+        Returned oldest first so the prompt reads chronologically.
+        """
+        if pet_id is None or token_budget <= 0:
+            return []
+        history = self._history(pet_id)
+        with self._lock:
+            turns = list(history)
+        if not turns:
+            return []
+
+        query_words = _keywords(query)
+        scored = []
+        for age, turn in enumerate(reversed(turns)):
+            turn_words = _keywords(f"{turn['query']} {turn.get('category') or ''}")
+            union = query_words | turn_words
+            relevance = len(query_words & turn_words) / len(union) if union else 0.0
+            recency = 1.0 / (1 + age)
+            score = (1 - self.recency_weight) * relevance + self.recency_weight * recency
+            scored.append((score, len(turns) - 1 - age, turn))
+
+        selected = []
+        used = 0
+        for score, position, turn in sorted(scored, key=lambda item: item[0], reverse=True):
+            cost = estimate_tokens(format_turn(turn))
+            if used + cost > token_budget:
+                continue
+            selected.append((position, turn))
+            used += cost
+        self.selected += len(selected)
+        self.dropped += len(turns) - len(selected)
+        return [turn for _, turn in sorted(selected, key=lambda item: item[0])]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "pets": len(self._pets),
+                "turns": sum(len(turns) for turns in self._pets.values()),
+                "window": self.window,
+                "selected": self.selected,
+                "dropped_for_budget": self.dropped,
+            }
+
+
+def format_turn(turn):
+    return f"- Q: {turn['query']}\n  A: {turn['answer']}"
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_conversation_memory(db):
+    """Process-wide memory so every session sees the same per-pet history"""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = PetConversationMemory(db)
+    return _memory
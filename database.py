@@ -1,108 +1,77 @@
 import os
 import json
-import mysql.connector
-import bcrypt
 from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from pet_cache import get_pet_cache, normalize_pet_name
+from audit_log_writer import LOG_INSERT_SQL, get_audit_log_writer
+from auth import check_password
+from prepared_statements import get_statement_registry, insert_sql, select_for_update_sql, update_sql, where_clause
+from db_pool import PoolExhaustedError, get_pool
+import metrics
+
+
+def _same_value(current, new):
+    """Compare a value read from MySQL with a caller-supplied one as the column would store it"""
+    if current is None or new is None:
+        return current is None and new is None
+    if isinstance(current, (bytes, bytearray)):
+        current = current.decode("utf-8", "replace")
+    if isinstance(new, bool):
+        new = int(new)
+    try:
+        if isinstance(current, (int, float, Decimal)):
+            return Decimal(str(current)) == Decimal(str(new).strip())
+        if isinstance(current, datetime):
+            return current == (new if isinstance(new, datetime) else datetime.fromisoformat(str(new)))
+        if isinstance(current, date):
+            return current == (new if isinstance(new, date) else date.fromisoformat(str(new)[:10]))
+        if isinstance(current, timedelta):
+            # TIME columns arrive as timedelta; callers pass "HH:MM[:SS]"
+            if not isinstance(new, timedelta):
+                hours, minutes, *seconds = (int(part) for part in str(new).split(":"))
+                new = timedelta(hours=hours, minutes=minutes, seconds=seconds[0] if seconds else 0)
+            return current == new
+    except (InvalidOperation, ValueError, TypeError):
+        return False
+    return str(current) == str(new)
 
 
 class Database:
     def __init__(self):
-        # Create connection pool for better connection management
-        self.pool_config = {
-            'pool_name': 'mypool',
-            'pool_size': 5,  # Adjust based on your needs
-            'host': os.getenv("MYSQL_DBHOST"),
-            'user': os.getenv("MYSQL_USER"),
-            'password': os.getenv("MYSQL_PASSWORD"),
-            'database': os.getenv("MYSQL_DBNAME"),
-            'charset': 'utf8mb4',
-            'autocommit': True,
-            'pool_reset_session': True
-        }
+        self.pet_cache = get_pet_cache()
+        self.statements = get_statement_registry()
+        # One process-wide pool shared by every Database instance. COM_RESET_CONNECTION on
+        # checkin would deallocate every prepared statement, so skip it when they are in use.
+        self.pool = get_pool(reset_session=not self.statements.enabled)
 
-        try:
-            self.pool = mysql.connector.pooling.MySQLConnectionPool(**self.pool_config)
-            print("Connection pool established successfully")
-        except Exception as e:
-            print(f"Error creating connection pool: {e}")
-            # Fallback to single connection
-            self.pool = None
-            self._create_single_connection()
-
-    def _create_single_connection(self):
-        """Fallback method to create a single connection"""
-        try:
-            self.connection = mysql.connector.connect(
-                host=os.getenv("MYSQL_DBHOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DBNAME"),
-                charset='utf8mb4',
-                autocommit=True
-            )
-            print("Single connection established successfully")
-        except Exception as e:
-            print(f"Error creating connection: {e}")
-            self.connection = None
+        # Audit rows are written off the request path unless AUDIT_LOG_ASYNC is turned off
+        async_logs = os.getenv("AUDIT_LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+        self.audit_log_writer = get_audit_log_writer(self) if async_logs else None
 
     @contextmanager
     def get_connection(self):
-        """Context manager to get and properly manage database connections"""
-        connection = None
-        try:
-            if self.pool:
-                connection = self.pool.get_connection()
-            else:
-                # Check if single connection is still alive
-                if hasattr(self, 'connection') and self.connection:
-                    if not self.connection.is_connected():
-                        self._create_single_connection()
-                    connection = self.connection
-                else:
-                    self._create_single_connection()
-                    connection = self.connection
+        """Check a connection out of the shared pool; raises PoolExhaustedError on timeout.
 
-            if connection and connection.is_connected():
-                yield connection
-            else:
-                raise Exception("Could not establish database connection")
-
-        except mysql.connector.Error as e:
-            print(f"Database connection error: {e}")
-            # Try to reconnect once
-            if self.pool:
-                try:
-                    connection = self.pool.get_connection()
-                    yield connection
-                except:
-                    raise Exception("Failed to reconnect to database")
-            else:
-                self._create_single_connection()
-                if hasattr(self, 'connection') and self.connection:
-                    yield self.connection
-                else:
-                    raise Exception("Failed to reconnect to database")
-        finally:
-            if connection and self.pool:
-                # Return connection to pool
-                connection.close()
+        Read methods let PoolExhaustedError through instead of returning None, so a saturated
+        pool is not mistaken for "no such row".
+        """
+        with self.pool.connection() as connection:
+            yield connection
 
+    @metrics.timed("db")
     def insert_data(self, table_name, data_dict, user_context=None):
         """Insert data with proper connection management"""
         try:
             with self.get_connection() as connection:
-                cursor = connection.cursor()
-                columns = list(data_dict.keys())
-                values = list(data_dict.values())
+                columns = tuple(data_dict.keys())
+                values = tuple(data_dict.values())
 
-                # Create placeholders
-                placeholders = ', '.join(['%s'] * len(columns))
-                columns_str = ', '.join(columns)
-
-                # Create a new record
-                sql = f"INSERT INTO `{table_name}` ({columns_str}) VALUES ({placeholders})"
-                cursor.execute(sql, values)
+                # Create a new record (SQL text cached per table/column shape)
+                cursor = self.statements.execute(connection, insert_sql(table_name, columns), values)
                 record_id = cursor.lastrowid
+                self._invalidate_cached_rows(table_name, data_dict)
 
                 # Commit if autocommit is False
                 if not connection.autocommit:
@@ -118,135 +87,294 @@ class Database:
                     connection=connection
                 )
 
-                cursor.close()
                 return record_id
 
         except Exception as e:
             print(f"Error inserting data: {e}")
             return False
 
+    @metrics.timed("db")
     def log_operation(self, table_name, operation, record_id=None, data_before=None,
                       data_after=None, user_context=None, connection=None):
-        """Log database operations for tracking"""
+        """Log database operations for tracking (queued for the background writer when enabled)"""
         try:
+            log_data = (
+                table_name,
+                operation,
+                record_id,
+                # Row values read back from MySQL may be Decimal/datetime
+                json.dumps(data_before, default=str) if data_before else None,
+                json.dumps(data_after, default=str) if data_after else None,
+                user_context or 'system'
+            )
+            if self.audit_log_writer:
+                self.audit_log_writer.enqueue(log_data)
+                return
+
             # Use provided connection or get a new one
             if connection:
-                cursor = connection.cursor()
-                log_query = """
-                INSERT INTO logs (table_name, operation, record_id, data_before, data_after, user_context)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                log_data = (
-                    table_name,
-                    operation,
-                    record_id,
-                    json.dumps(data_before) if data_before else None,
-                    json.dumps(data_after) if data_after else None,
-                    user_context or 'system'
-                )
-                cursor.execute(log_query, log_data)
-                if not connection.autocommit:
-                    connection.commit()
-                cursor.close()
+                self._write_log_row(connection, log_data)
             else:
-                # Get connection if not provided
                 with self.get_connection() as conn:
-                    cursor = conn.cursor()
-                    log_query = """
-                    INSERT INTO logs (table_name, operation, record_id, data_before, data_after, user_context)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    log_data = (
-                        table_name,
-                        operation,
-                        record_id,
-                        json.dumps(data_before) if data_before else None,
-                        json.dumps(data_after) if data_after else None,
-                        user_context or 'system'
-                    )
-                    cursor.execute(log_query, log_data)
-                    if not conn.autocommit:
-                        conn.commit()
-                    cursor.close()
+                    self._write_log_row(conn, log_data)
 
         except Exception as e:
             print(f"Error logging operation: {e}")
 
-    def update_data(self, table_name, data, condition, user_context=None):
-        """Update data with proper connection management"""
-        try:
-            with self.get_connection() as connection:
-                cursor = connection.cursor()
-
-                # First, get the current data for logging
-                select_query = f"SELECT * FROM {table_name} WHERE {condition}"
-                cursor.execute(select_query)
-                current_data = cursor.fetchone()
-                columns = [desc[0] for desc in cursor.description] if cursor.description else []
-
-                # Perform the update
-                set_clause = ', '.join([f"{key} = %s" for key in data.keys()])
-                query = f"UPDATE {table_name} SET {set_clause} WHERE {condition}"
+    def _write_log_row(self, connection, log_data):
+        self.statements.execute(connection, LOG_INSERT_SQL, log_data)
+        if not connection.autocommit:
+            connection.commit()
+
+    @metrics.timed("db")
+    def update_data(self, table_name, data, where, user_context=None, key_column="id"):
+        """Update rows matching a structured condition and log a per-row diff.
+
+        where is {column: value}; list values become IN (...) and None becomes IS NULL.
+        Only the key and the changed columns are read, locked with FOR UPDATE in the
+        same transaction as the UPDATE. Returns the number of rows changed, or False.
+        """
+        if not data or not where:
+            print("update_data needs both data and a where condition")
+            return False
 
-                cursor.execute(query, tuple(data.values()))
+        try:
+            set_columns = tuple(data.keys())
+            new_values = tuple(data.values())
+            where_shape, where_params = where_clause(where)
 
-                if not connection.autocommit:
-                    connection.commit()
+            # pet_profile rows also need their owner so only that owner's cache entry is dropped
+            read_columns = (key_column,) + tuple(c for c in set_columns if c != key_column)
+            if table_name == "pet_profile" and "owner" not in read_columns:
+                read_columns += ("owner",)
 
-                # Log the update operation
-                if current_data and columns:
-                    data_before = dict(zip(columns, current_data))
-                    self.log_operation(
-                        table_name=table_name,
-                        operation='UPDATE',
-                        data_before=data_before,
-                        data_after=data,
-                        user_context=user_context,
-                        connection=connection
+            with self.get_connection() as connection:
+                connection.start_transaction()
+                try:
+                    cursor = self.statements.execute(
+                        connection, select_for_update_sql(table_name, read_columns, where_shape), where_params
                     )
+                    rows = [dict(zip(read_columns, row)) for row in cursor.fetchall()]
+                    if rows:
+                        self.statements.execute(
+                            connection, update_sql(table_name, set_columns, where_shape), new_values + where_params
+                        )
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+
+            if table_name == "pet_profile":
+                for owner in {row.get("owner") for row in rows} | {data.get("owner")}:
+                    if owner is not None:
+                        self.pet_cache.invalidate_owner(owner)
+
+            # Log a compact diff for every affected row, not just the first
+            for row in rows:
+                data_before = {
+                    column: row[column] for column in set_columns if not _same_value(row.get(column), data[column])
+                }
+                if not data_before:
+                    continue
+                self.log_operation(
+                    table_name=table_name,
+                    operation='UPDATE',
+                    record_id=row[key_column],
+                    data_before=data_before,
+                    data_after={column: data[column] for column in data_before},
+                    user_context=user_context
+                )
 
-                cursor.close()
-                return True
+            return len(rows)
 
         except Exception as e:
             print(f"Error updating data: {e}")
             return False
 
+    def _invalidate_cached_rows(self, table_name, data_dict=None):
+        if table_name != "pet_profile":
+            return
+        if data_dict and data_dict.get("owner") is not None:
+            self.pet_cache.invalidate_owner(data_dict["owner"])
+        else:
+            self.pet_cache.invalidate_all()
+
+    @metrics.timed("db")
     def get_pet_by_name(self, name, id):
-        """Get pet profile by name"""
+        """Get pet profile by name (served from the per-owner cache when warm)"""
+        pets = self.pet_cache.get_owner(id)
+        if pets is None:
+            # Taken before the query so a concurrent invalidation makes the fill a no-op
+            generation = self.pet_cache.generation(id)
+            pets = self.get_pets_by_owner(id)
+            if pets is None:
+                return None
+            self.pet_cache.put_owner(id, pets, generation)
+        return pets.get(normalize_pet_name(name))
+
+    @metrics.timed("db")
+    def get_pets_by_owner(self, id):
+        """Load all of an owner's pets in one query, keyed by normalized name"""
+        try:
+            with self.get_connection() as connection:
+                query = "SELECT * FROM pet_profile WHERE owner = %s ORDER BY id"
+                cursor = self.statements.execute(connection, query, (id,))
+                rows = cursor.fetchall()
+                name_index = list(cursor.column_names).index("name")
+
+            pets = {}
+            for row in rows:
+                # Keep the oldest profile when an owner reuses a name, like the old fetchone() did
+                pets.setdefault(normalize_pet_name(row[name_index]), row)
+            return pets
+
+        except PoolExhaustedError:
+            raise
+        except Exception as e:
+            print(f"Error fetching pet data: {e}")
+            return None
+
+    @metrics.timed("db")
+    def get_due_routines(self, until, limit=1000):
+        """Active routines with next_due_at <= until, oldest first (range scan on idx_notifications_due)"""
+        try:
+            with self.get_connection() as connection:
+                query = """
+                SELECT n.id, n.pet_id, p.owner, p.name AS pet_name, n.care_type, n.description,
+                       n.recurrence, n.next_due_at
+                FROM notifications n
+                JOIN pet_profile p ON p.id = n.pet_id
+                WHERE n.is_active = 1 AND n.next_due_at <= %s
+                ORDER BY n.next_due_at
+                LIMIT %s
+                """
+                cursor = self.statements.execute(connection, query, (until, limit))
+                columns = list(cursor.column_names)
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        except PoolExhaustedError:
+            raise
+        except Exception as e:
+            print(f"Error fetching due care routines: {e}")
+            return None
+
+    @metrics.timed("db")
+    def get_recent_health_queries(self, pet_id, limit=20):
+        """Latest logged HEALTH exchanges for a pet, newest first, as decoded data_after dicts.
+
+        Served by idx_logs_table_record (scripts/add_health_history_index.py).
+        """
+        try:
+            with self.get_connection() as connection:
+                query = """
+                SELECT data_after FROM logs
+                WHERE table_name = 'health_queries' AND record_id = %s
+                ORDER BY id DESC
+                LIMIT %s
+                """
+                rows = self.statements.execute(connection, query, (pet_id, limit)).fetchall()
+
+            entries = []
+            for (data_after,) in rows:
+                if isinstance(data_after, (bytes, bytearray)):
+                    data_after = data_after.decode("utf-8")
+                try:
+                    entry = json.loads(data_after) if data_after else None
+                except (json.JSONDecodeError, TypeError):
+                    entry = None
+                if isinstance(entry, dict):
+                    entries.append(entry)
+            return entries
+
+        except PoolExhaustedError:
+            raise
+        except Exception as e:
+            print(f"Error fetching health history: {e}")
+            return None
+
+    @metrics.timed("db")
+    def advance_routines(self, next_due, chunk_size=500):
+        """Bulk-set next_due_at from [(routine_id, next_due_at), ...] with one UPDATE per chunk"""
+        return self._bulk_set_notifications("next_due_at", next_due, chunk_size)
+
+    @metrics.timed("db")
+    def set_routine_recurrences(self, recurrences, chunk_size=500):
+        """Bulk-set recurrence from [(routine_id, recurrence), ...]"""
+        return self._bulk_set_notifications("recurrence", recurrences, chunk_size)
+
+    def _bulk_set_notifications(self, column, values_by_id, chunk_size):
+        if not values_by_id:
+            return 0
+        updated = 0
         try:
             with self.get_connection() as connection:
                 cursor = connection.cursor()
-                query = "SELECT * FROM pet_profile WHERE name = %s and owner = %s"
-                cursor.execute(query, (name,id,))
-                result = cursor.fetchone()
+                for start in range(0, len(values_by_id), chunk_size):
+                    chunk = values_by_id[start:start + chunk_size]
+                    cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    query = (f"UPDATE notifications SET {column} = CASE id {cases} END "
+                             f"WHERE id IN ({placeholders})")
+                    params = [value for routine_id, new_value in chunk for value in (routine_id, new_value)]
+                    params.extend(routine_id for routine_id, _ in chunk)
+                    cursor.execute(query, params)
+                    updated += cursor.rowcount
+                if not connection.autocommit:
+                    connection.commit()
                 cursor.close()
-                return result
+            return updated
 
         except Exception as e:
-            print(f"Error fetching pet data: {e}")
-            return None
+            print(f"Error updating notifications.{column}: {e}")
+            return False
 
     def get_user_account(self, email, pwd):
         """Authenticate user account"""
+        data = self.get_user_credentials(email)
+        if not data:
+            return None
+
+        user_id, password = data
+        try:
+            # Connection is already back in the pool; bcrypt runs on a native thread
+            if check_password(pwd, password):
+                return user_id
+        except Exception as e:
+            print(f"Error during login: {e}")
+        return None
+
+    @metrics.timed("db")
+    def get_user_credentials(self, email):
+        """Return (id, password hash) for the email, or None"""
         try:
             with self.get_connection() as connection:
-                cursor = connection.cursor()
                 query = "SELECT id, password FROM users WHERE email = %s"
-                cursor.execute(query, (email,))
-                data = cursor.fetchone()
-                cursor.close()
-
-                if data:
-                    user_id, password = data
-                    if bcrypt.checkpw(pwd.encode('utf-8'), password.encode('utf-8')):
-                        return user_id
-                return None
+                # Drain the result so the prepared cursor can be reused
+                rows = self.statements.execute(connection, query, (email,)).fetchall()
+                return rows[0] if rows else None
 
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"Error during login: {e}")
             return None
 
+    @metrics.timed("db")
+    def user_exists(self, email):
+        """Indexed existence check on users.email, no password work"""
+        try:
+            with self.get_connection() as connection:
+                query = "SELECT 1 FROM users WHERE email = %s LIMIT 1"
+                rows = self.statements.execute(connection, query, (email,)).fetchall()
+                return bool(rows)
+
+        except PoolExhaustedError:
+            raise
+        except Exception as e:
+            print(f"Error checking user: {e}")
+            return False
+
+    @metrics.timed("db")
     def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
         """Generic method to execute queries"""
         try:
@@ -271,19 +399,9 @@ class Database:
             print(f"Error executing query: {e}")
             return None
 
-    def close(self):
-        """Close all connections"""
-        try:
-            if self.pool:
-                # Connection pool will handle cleanup automatically
-                pass
-            elif hasattr(self, 'connection') and self.connection:
-                if self.connection.is_connected():
-                    self.connection.close()
-                    print("Single connection closed successfully")
-        except Exception as e:
-            print(f"Error closing connections: {e}")
+    def get_pool_stats(self):
+        return self.pool.get_stats()
 
-    def __del__(self):
-        """Cleanup when object is destroyed"""
-        self.close()
+    def close(self):
+        """Connections belong to the shared pool; nothing to release per instance"""
+        pass
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+
+# mysql-connector refuses pools larger than this
+MAX_POOL_SIZE = pooling.CNX_POOL_MAXSIZE
+
+
+class PoolExhaustedError(Exception):
+    """No connection became available within the checkout timeout"""
+
+
+def _connect_config():
+    return {
+        'host': os.getenv("MYSQL_DBHOST"),
+        'user': os.getenv("MYSQL_USER"),
+        'password': os.getenv("MYSQL_PASSWORD"),
+        'database': os.getenv("MYSQL_DBNAME"),
+        'charset': 'utf8mb4',
+        'autocommit': True,
+    }
+
+
+class ObservablePool:
+    """MySQL pool with bounded overflow, checkout timeouts and usage metrics"""
+
+    def __init__(self, name, size, overflow, timeout, reset_session=True, connect_config=None):
+        self.name = name
+        self.size = max(1, min(size, MAX_POOL_SIZE))
+        self.overflow = max(0, overflow)
+        self.timeout = timeout
+        self.reset_session = reset_session
+        self.connect_config = connect_config or _connect_config()
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size + self.overflow)
+        self._lock = threading.Lock()
+
+        self.in_use = 0
+        self.overflow_in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.exhausted = 0
+        self.connection_errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _get_pool(self):
+        # Created lazily so a DB outage at import time fails requests, not the whole process
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name=self.name,
+                        pool_size=self.size,
+                        pool_reset_session=self.reset_session,
+                        **self.connect_config
+                    )
+                    print(f"Connection pool '{self.name}' established (size {self.size}, overflow {self.overflow})")
+        return self._pool
+
+    def _checkout(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.exhausted += 1
+            raise PoolExhaustedError(
+                f"Connection pool '{self.name}' exhausted: {self.size + self.overflow} connections "
+                f"in use for {self.timeout:.1f}s"
+            )
+        waited = time.perf_counter() - started
+
+        try:
+            try:
+                connection = self._get_pool().get_connection()
+                is_overflow = False
+            except pooling.PoolError:
+                # Every pooled connection is out but we still hold a slot: open a temporary one
+                connection = mysql.connector.connect(**self.connect_config)
+                is_overflow = True
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self.connection_errors += 1
+            raise
+
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if is_overflow:
+                self.overflow_checkouts += 1
+                self.overflow_in_use += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return connection, is_overflow
+
+    def _release(self, connection, is_overflow):
+        try:
+            # Pooled connections go back to the pool; overflow ones are really closed
+            connection.close()
+        except Exception as e:
+            print(f"Error releasing connection: {e}")
+            with self._lock:
+                self.connection_errors += 1
+        finally:
+            with self._lock:
+                self.in_use -= 1
+                if is_overflow:
+                    self.overflow_in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        connection, is_overflow = self._checkout()
+        try:
+            yield connection
+        finally:
+            self._release(connection, is_overflow)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": self.size,
+                "overflow": self.overflow,
+                "in_use": self.in_use,
+                "overflow_in_use": self.overflow_in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": self.in_use / self.size,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "exhausted": self.exhausted,
+                "connection_errors": self.connection_errors,
+                "avg_wait_ms": (self.wait_seconds_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_wait_ms": self.wait_seconds_max * 1000,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name="default", reset_session=True):
+    """Process-wide pool registry; every component asks here instead of building its own pool"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ObservablePool(
+                    name=name,
+                    size=int(os.getenv("MYSQL_POOL_SIZE", "5")),
+                    overflow=int(os.getenv("MYSQL_POOL_OVERFLOW", "5")),
+                    timeout=float(os.getenv("MYSQL_POOL_TIMEOUT", "5")),
+                    reset_session=reset_session,
+                )
+                _pools[name] = pool
+    return pool
+
+
+def get_pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.get_stats() for pool in pools]
@@ -0,0 +1,71 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_timeout():
+    """(connect, read) timeout tuple for outbound HTTP calls"""
+    return (
+        _env_float("HTTP_CONNECT_TIMEOUT", 5.0),
+        _env_float("HTTP_READ_TIMEOUT", 60.0),
+    )
+
+
+def _build_session():
+    pool_size = _env_int("HTTP_POOL_SIZE", 10)
+    retry = Retry(
+        total=_env_int("HTTP_MAX_RETRIES", 3),
+        backoff_factor=_env_float("HTTP_BACKOFF_FACTOR", 0.5),
+        backoff_jitter=_env_float("HTTP_BACKOFF_JITTER", 0.5),
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        # Hand the last 429/5xx back to the caller instead of raising MaxRetryError
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    print(f"HTTP client ready (pool size {pool_size}, timeouts {get_timeout()})")
+    return session
+
+
+def get_http_session():
+    """Process-wide requests.Session with pooled keep-alive connections and retries"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_http_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
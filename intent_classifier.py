@@ -0,0 +1,137 @@
+import math
+import os
+import re
+
+INTENTS = ("CREATE_PROFILE", "CARE_ROUTINE", "HEALTH", "GENERAL")
+
+# Weighted n-gram features per intent. A trailing "*" matches the stem plus one of
+# STEM_SUFFIXES as a whole token ("ear*" matches "ears" but not "early").
+INTENT_FEATURES = {
+    "CREATE_PROFILE": {
+        "profile": 3.0, "create": 1.5, "register": 2.0, "sign up": 2.0, "new pet": 2.5, "add my": 2.0,
+        "named": 1.5, "called": 1.0, "name is": 2.0, "breed": 1.5, "year old": 1.5,
+        "years old": 1.5, "month old": 1.5, "months old": 1.5, "i have a": 1.5,
+        "i got a": 1.5, "we got a": 1.5, "adopted": 1.5, "rescue": 1.0,
+        "save": 1.5, "record": 1.5, "details": 1.5, "information": 1.5, "info": 1.5, "update": 1.0,
+    },
+    "CARE_ROUTINE": {
+        "remind*": 3.0, "schedul*": 2.5, "routine": 2.5, "forget": 2.5, "alert me": 2.5,
+        "ping me": 2.5, "set up": 1.0, "feed*": 2.0, "walk*": 2.0, "groom*": 2.0, "bath*": 1.5,
+        "brush*": 1.5, "clean*": 1.5, "trim*": 1.5, "every": 2.0, "daily": 2.0, "weekly": 2.0,
+        "monthly": 2.0, "twice": 1.5, "once a": 1.5, "each": 1.5, "times a": 1.5,
+        "morning": 1.0, "evening": 1.0, "night": 0.5, "mondays": 2.0, "tuesdays": 2.0,
+        "wednesdays": 2.0, "thursdays": 2.0, "fridays": 2.0, "saturdays": 2.0, "sundays": 2.0,
+        "dose": 1.0, "pill*": 1.0, "drops": 1.0, "treatment": 1.0, "medication": 1.0, "medicine": 1.0,
+    },
+    "HEALTH": {
+        "vomit*": 3.0, "throw* up": 3.0, "threw up": 3.0, "sick": 3.0, "ill": 2.0, "symptom*": 3.0,
+        "diarrh*": 3.0, "limp*": 3.0, "itch*": 2.5, "scratch*": 2.0, "fever": 3.0,
+        "cough*": 3.0, "sneez*": 3.0, "letharg*": 3.0, "blood*": 2.5, "bleed*": 3.0,
+        "vet": 1.5, "pain": 2.5, "hurt*": 2.5, "swell*": 2.5, "swollen": 2.5, "puffy": 2.5,
+        "rash": 2.5, "lump": 3.0, "stung": 2.5, "pant*": 2.5, "breath": 2.0, "gums": 2.0,
+        "worm*": 2.0, "flea*": 1.5, "tick*": 1.5, "allerg*": 2.5, "not eating": 3.0,
+        "won't eat": 3.0, "stopped eating": 3.0, "normal": 2.0, "than usual": 2.5, "is it safe": 2.5,
+        "safe for": 2.0, "okay": 1.0, "healthy": 2.0, "health": 2.5, "shaking": 2.5, "breathing": 2.5,
+        "poison*": 3.0, "ate": 1.5, "eat": 1.0, "weight": 1.5, "losing": 1.0, "hair loss": 2.5,
+        "pluck*": 2.5, "infection": 3.0, "ear*": 1.0, "eye*": 1.0, "teeth": 1.0, "vaccin*": 2.0,
+        "worried": 2.0,
+    },
+    "GENERAL": {
+        "hello": 3.0, "hi": 3.0, "hey": 2.5, "thanks": 3.0, "thank you": 3.0, "appreciate": 3.0,
+        "weather": 3.0, "joke": 3.0, "football": 3.0, "game": 2.0, "movie": 3.0, "recommend": 1.5,
+        "news": 2.5, "your name": 3.0, "how are you": 3.0, "are you": 2.0, "what can you": 3.0,
+        "what time": 2.0, "good morning": 2.0, "good evening": 2.0, "capital": 2.5, "invented": 2.5,
+        "bye": 3.0, "goodbye": 3.0, "see you": 3.0, "that's all": 3.0,
+    },
+}
+
+# Evidence every intent starts with; GENERAL wins ties when nothing matches
+INTENT_PRIORS = {"CREATE_PROFILE": 0.0, "CARE_ROUTINE": 0.0, "HEALTH": 0.0, "GENERAL": 0.5}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Inflectional endings (plus the few the stems above need, e.g. diarrh-ea, letharg-ic)
+STEM_SUFFIXES = frozenset((
+    "", "s", "es", "e", "d", "ed", "ing", "er", "ers", "y", "ies", "ic",
+    "ea", "oea", "ous", "ated", "ation", "ations",
+))
+
+
+def _ngrams(tokens, max_n=3):
+    grams = set()
+    for n in range(1, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            grams.add(" ".join(tokens[i:i + n]))
+    return grams
+
+
+def _feature_matches(feature, tokens, grams):
+    if "*" not in feature:
+        return feature in grams
+
+    # Stem feature, optionally followed by exact words ("throw* up")
+    words = feature.split()
+    for i in range(len(tokens) - len(words) + 1):
+        if all(
+            _stem_matches(word[:-1], tokens[i + j]) if word.endswith("*") else tokens[i + j] == word
+            for j, word in enumerate(words)
+        ):
+            return True
+    return False
+
+
+def _stem_matches(stem, token):
+    return token.startswith(stem) and token[len(stem):] in STEM_SUFFIXES
+
+
+class IntentClassifier:
+    """Cheap keyword/n-gram intent scorer used in front of the INTENT_PROMPT LLM call"""
+
+    def __init__(self, threshold=None, features=None, temperature=1.0):
+        if threshold is None:
+            threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+        self.threshold = threshold
+        self.features = features or INTENT_FEATURES
+        self.temperature = temperature
+        self.local_hits = 0
+        self.llm_fallbacks = 0
+
+    def scores(self, text):
+        """Return {intent: probability} for text, softmax over summed feature weights"""
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        grams = _ngrams(tokens)
+
+        raw = {}
+        for intent in INTENTS:
+            raw[intent] = INTENT_PRIORS.get(intent, 0.0) + sum(
+                weight for feature, weight in self.features.get(intent, {}).items()
+                if _feature_matches(feature, tokens, grams)
+            )
+
+        peak = max(raw.values())
+        exp = {intent: math.exp((value - peak) / self.temperature) for intent, value in raw.items()}
+        total = sum(exp.values())
+        return {intent: value / total for intent, value in exp.items()}
+
+    def classify(self, text):
+        """Return (intent, confidence) for the most likely intent"""
+        probabilities = self.scores(text)
+        intent = max(probabilities, key=probabilities.get) # type: ignore
+        return intent, probabilities[intent]
+
+    def is_confident(self, confidence):
+        return confidence >= self.threshold
+
+    def record(self, used_local):
+        if used_local:
+            self.local_hits += 1
+        else:
+            self.llm_fallbacks += 1
+
+    def get_stats(self):
+        total = self.local_hits + self.llm_fallbacks
+        return {
+            "local_hits": self.local_hits,
+            "llm_fallbacks": self.llm_fallbacks,
+            "llm_calls_avoided": self.local_hits / total if total else 0.0,
+        }
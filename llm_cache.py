@@ -0,0 +1,212 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Templates whose replies only depend on the transcript; HEALTH_RESPONSE_PROMPT is free-form
+CACHEABLE_TEMPLATES = {
+    "INTENT_PROMPT",
+    "FUSED_INTENT_PROMPT",
+    "BREED_AGE_PROMPT",
+    "CARE_ROUTINE_PROMPT",
+    "HEALTH_EXTRACT_PROMPT",
+}
+FREE_FORM_TEMPLATES = {"HEALTH_RESPONSE_PROMPT"}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION_RE = re.compile(r"[\s.!?,]+$")
+
+
+def normalize_transcript(text):
+    """Case-fold, collapse whitespace and drop trailing punctuation so repeats share a key"""
+    text = _WHITESPACE_RE.sub(" ", (text or "").strip().lower())
+    return _TRAILING_PUNCTUATION_RE.sub("", text)
+
+
+def cache_key(model, template, transcript):
+    raw = f"{model}\x1f{template}\x1f{normalize_transcript(transcript)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LLMCache:
+    """LRU+TTL cache for deterministic LLM replies with an optional SQLite tier and single-flight"""
+
+    def __init__(self, max_entries=None, ttl_seconds=None, sqlite_path=None, cache_free_form=None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        if cache_free_form is None:
+            cache_free_form = os.getenv("LLM_CACHE_FREE_FORM", "false").lower() in ("1", "true", "yes")
+        self.cache_free_form = cache_free_form
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        sqlite_path = sqlite_path if sqlite_path is not None else os.getenv("LLM_CACHE_SQLITE_PATH")
+        if sqlite_path:
+            self._open_sqlite(sqlite_path)
+
+    def _open_sqlite(self, path):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            print(f"LLM cache disk tier opened at {path}")
+        except sqlite3.Error as e:
+            print(f"Error opening LLM cache database: {e}")
+            self._db = None
+
+    def is_cacheable(self, template):
+        if template in CACHEABLE_TEMPLATES:
+            return True
+        return self.cache_free_form and template in FREE_FORM_TEMPLATES
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self._disk_get(key, now)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._store(key, value, now)
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+        self._disk_set(key, value, now + self.ttl_seconds)
+
+    def _store(self, key, value, now):
+        self._entries[key] = (now + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key, now):
+        if not self._db:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"Error reading LLM cache database: {e}")
+            return None
+
+    def _disk_set(self, key, value, expires_at):
+        if not self._db:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing LLM cache database: {e}")
+
+    def get_or_compute(self, key, compute, should_cache=None):
+        """Return the cached reply for key, or run compute() once for all concurrent callers"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait() # type: ignore
+            if flight.error: # type: ignore
+                raise flight.error # type: ignore
+            return flight.value # type: ignore
+
+        try:
+            value = compute()
+            flight.value = value # type: ignore
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+            return value
+        except Exception as e:
+            flight.error = e # type: ignore
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.event.set() # type: ignore
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide LLMCache, built on first use so .env settings are loaded"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
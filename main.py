@@ -1,13 +1,26 @@
 import eventlet
 eventlet.monkey_patch()
-import bcrypt
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO, emit
+import os
+from flask import Flask, Response, request, jsonify
+from flask_socketio import SocketIO, emit, join_room
 from web_socket_handler import WebSocketHandler
-from speech_processor import SpeechProcessor
+from session_manager import SessionManager
+from action import Action
 from dotenv import load_dotenv
 from database import Database
 from flask_cors import CORS
+from auth import hash_password, issue_session_token, verify_session_token
+from reminder_scheduler import ReminderScheduler
+from conversation_memory import get_conversation_memory
+from db_pool import PoolExhaustedError, get_pool_stats
+from audio_send_queue import get_totals as get_audio_queue_totals
+from vad import get_totals as get_vad_totals
+from llm_cache import get_llm_cache
+from pet_cache import get_pet_cache
+from prepared_statements import get_statement_registry
+from stt_pool import get_stt_pool
+from speculative_extraction import get_extraction_totals, get_partial_totals
+import metrics
 
 load_dotenv()
 app = Flask(__name__)
@@ -16,57 +29,131 @@ CORS(app)
 
 ws_handler = WebSocketHandler()
 db = Database()
-def on_transcription_result(text: str):
-    sid = ws_handler.last_active_sid
-    if sid:
-        print(f"🔥 Emitting transcription: {text} to SID: {sid}")
-        # Use socketio.emit directly - no threading needed with eventlet
-        socketio.emit("transcription", {"text": text}, to=sid)
-    else:
-        print("⚠️ No active SID to emit transcription")
-
-
-def on_ai_response_result(text: str):
-    sid = ws_handler.last_active_sid
-    if sid:
-        print(f"🔥 Emitting AI Response: {text} to SID: {sid}")
-        # Use socketio.emit directly - no threading needed with eventlet
-        socketio.emit("ai_response", {"text": text}, to=sid)
-
-        # Also try broadcasting to all clients as a test
-        # socketio.emit("ai_response", {"text": text})
-    else:
-        print("⚠️ No active SID to emit AI response")
-
-processor = SpeechProcessor(on_transcription_result=on_transcription_result, on_ai_response_result=on_ai_response_result)
+def on_transcription_result(sid, text: str):
+    print(f"🔥 Emitting transcription: {text} to SID: {sid}")
+    # Use socketio.emit directly - no threading needed with eventlet
+    socketio.emit("transcription", {"text": text}, to=sid)
+
+
+def on_ai_response_result(sid, text: str):
+    print(f"🔥 Emitting AI Response: {text} to SID: {sid}")
+    # Use socketio.emit directly - no threading needed with eventlet
+    with metrics.span("emit", "ai_response"):
+        # turn_id lets clients match this answer to the server-side spans
+        socketio.emit("ai_response", {"text": text, "turn_id": metrics.current_turn_id()}, to=sid)
+
+
+def on_ai_response_delta(sid, token: str):
+    # Partial tokens for clients that negotiated stream_responses; the final ai_response still follows
+    socketio.emit("ai_response_delta", {"text": token}, to=sid)
+
+def on_audio_backpressure(sid, paused: bool):
+    # Sent when the session's audio queue fills (AUDIO_QUEUE_POLICY=pause) and again once it drains
+    socketio.emit("audio_backpressure", {"paused": paused}, to=sid)
+
+def user_room(user_id):
+    return f"user:{user_id}"
+
+
+def on_care_reminder(owner, payload):
+    # Every socket the owner has open joined this room at connect time
+    print(f"⏰ Care reminder for owner {owner}: {payload['care_type']} ({payload['pet_name']})")
+    socketio.emit("care_reminder", payload, to=user_room(owner))
+
+reminder_scheduler = ReminderScheduler(db, on_care_reminder)
+stt_pool = get_stt_pool()
+
+# socketio.run(debug=True) re-runs this file under the reloader; the watcher process never
+# serves clients, so only the serving process (or an importing WSGI server) starts background work
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    reminder_scheduler.start()
+    # Starts the pool's loop; upstream sessions are only dialed once streams start
+    stt_pool.start()
+
+sessions = SessionManager(
+    ws_handler,
+    on_transcription_result=on_transcription_result,
+    on_ai_response_result=on_ai_response_result,
+    action=Action(reminder_scheduler=reminder_scheduler),
+    on_ai_response_delta=on_ai_response_delta,
+    on_audio_backpressure=on_audio_backpressure,
+)
+
+# Component counters already tracked in-process, exported next to the latency histograms
+registry = metrics.get_registry()
+registry.register_stats("sessions", lambda: {"active": len(ws_handler.active_connections)})
+registry.register_stats("db_pool", lambda: {pool["name"]: pool for pool in get_pool_stats()})
+registry.register_stats("prepared_statements", get_statement_registry().get_stats)
+registry.register_stats("pet_cache", get_pet_cache().get_stats)
+registry.register_stats("llm_cache", get_llm_cache().get_stats)
+registry.register_stats("reminders", reminder_scheduler.get_stats)
+registry.register_stats("audio_queue", get_audio_queue_totals)
+registry.register_stats("vad", get_vad_totals)
+registry.register_stats("stt_pool", stt_pool.get_stats)
+registry.register_stats("partial_intent", get_partial_totals)
+registry.register_stats("speculative_extraction", get_extraction_totals)
+registry.register_stats("pet_memory", get_conversation_memory(db).get_stats)
+if db.audit_log_writer:
+    registry.register_stats("audit_log", db.audit_log_writer.get_stats)
 
 @socketio.on('connect')
-def handle_connect():
-    ws_handler.handle_connection(request.sid) # type: ignore
+def handle_connect(auth=None):
+    session = sessions.create_session(request.sid) # type: ignore
+    # Optional login token: binds the socket to a verified user without touching bcrypt
+    if isinstance(auth, dict) and auth.get("token"):
+        session["user_id"] = verify_session_token(auth["token"])
+        if session["user_id"] is not None:
+            join_room(user_room(session["user_id"]))
     emit('connected', {'status': 'Connected to speech processing server'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f"Client disconnected: {request.sid}") # type: ignore
     # Clean up any resources for this client
-    ws_handler.handle_disconnection(request.sid) # type: ignore
-    emit('ai_response', {'text': 'Connected to speech processing server'})
+    sessions.close_session(request.sid) # type: ignore
 
 @socketio.on("start_audio_stream")
 def handle_start_audio(data):
-    processor.start_stream()
+    processor = sessions.get_processor(request.sid) # type: ignore
+    if processor:
+        # Clients opt into raw PCM frames; anything else keeps the legacy base64 text frames
+        options = data if isinstance(data, dict) else {}
+        try:
+            processor.start_stream(
+                binary_audio=bool(options.get("binary_audio")),
+                stream_responses=bool(options.get("stream_responses")),
+                vad=options.get("vad"),
+                audio_format=options.get("audio_format"),
+                auto_turn=options.get("auto_turn"),
+                turn_debounce_ms=options.get("turn_debounce_ms"),
+                # Turns processed server-side run for the verified user when there is one
+                user_id=sessions.get_user_id(request.sid) or options.get("id"), # type: ignore
+                speculative_intent=options.get("speculative_intent"),
+            )
+        except ValueError as e:
+            # Returned as the event's ack so the client learns why nothing is streaming
+            print(f"Rejected audio stream for {request.sid}: {e}") # type: ignore
+            return {"error": str(e)}
 
 @socketio.on("audio_data")
 def handle_audio(pcm_bytes):
-    ws_handler.last_active_sid = request.sid  # type: ignore # Ensure SID is always current
-
-    processor.send_audio(pcm_bytes)  # ✅ Send raw bytes, not base64
+    processor = sessions.get_processor(request.sid) # type: ignore
+    if processor:
+        processor.send_audio(pcm_bytes)
 
 
 @socketio.on("stop_audio_stream")
 def handle_stop_audio(data):
-    # processor.close_stream()
-    processor.process_request(data['text'], data['id'])
+    processor = sessions.get_processor(request.sid) # type: ignore
+    if processor:
+        # processor.close_stream()
+        if processor.auto_turn and not (isinstance(data, dict) and data.get("text")):
+            # Server-driven sessions can end the turn early without echoing the transcript
+            processor.flush_turn()
+            return
+        # Prefer the user id verified at connect time over the one the client sends
+        user_id = sessions.get_user_id(request.sid) or data['id'] # type: ignore
+        processor.process_client_turn(data['text'], user_id)
 
 
 @app.route('/api/auth/register', methods=['POST'])
@@ -75,16 +162,15 @@ def register():
         data = request.get_json()
         email = data.get('email')
         password = data.get('password')
-        print(email, password)
         #Validation
         if not email or not password:
             return jsonify({'error': 'Email and password required'}), 400
 
         # # Check if user exists
-        exists = db.get_user_account(email, password)
+        exists = db.user_exists(email)
         if not exists:
             #create
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            hashed_password = hash_password(password)
             payload = {
                 "email": email,
                 "password": hashed_password
@@ -98,6 +184,9 @@ def register():
             return jsonify({
                 'message': 'User already exists'
             }), 403
+    except PoolExhaustedError as e:
+        print(f"⚠️ {e}")
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -116,15 +205,29 @@ def login():
         if id is not None:
             #create
             return jsonify({
-                'user_id': id
+                'user_id': id,
+                'token': issue_session_token(id)
             }), 201
         else:
             return jsonify({
                 'message': "User doesn't exists",
             }), 403
+    except PoolExhaustedError as e:
+        print(f"⚠️ {e}")
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/metrics/turns', methods=['GET'])
+def recent_turns():
+    # Per-turn stage breakdown keyed by the correlation id sent with ai_response
+    limit = request.args.get("limit", default=50, type=int)
+    return jsonify({"turns": metrics.recent_turns(limit)})
+
 if __name__ == "__main__":
     print("Starting Speech Processing WebSocket Server...")
     print("WebSocket events:")
@@ -0,0 +1,291 @@
+import contextvars
+import functools
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Latency buckets (seconds) spanning sub-ms DB reads up to slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Correlation id of the voice turn being processed by the current green thread
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Prometheus text-format registry: our histograms/counters plus every component's get_stats()"""
+
+    def __init__(self, namespace="petcare"):
+        self.namespace = namespace
+        self._metrics = OrderedDict()
+        self._stats_sources = OrderedDict()  # subsystem -> callable returning a flat-ish dict
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(f"{self.namespace}_{name}", documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(f"{self.namespace}_{name}", documentation, labelnames, buckets))
+
+    def register_stats(self, subsystem, get_stats):
+        """Expose a component's get_stats() numbers as gauges named <namespace>_<subsystem>_<key>"""
+        with self._lock:
+            self._stats_sources[subsystem] = get_stats
+
+    def _render_stats(self, subsystem, get_stats):
+        try:
+            stats = get_stats() or {}
+        except Exception as e:
+            print(f"Error collecting {subsystem} stats: {e}")
+            return []
+
+        lines = []
+        for key, value in _flatten(stats):
+            if isinstance(value, bool):
+                value = int(value)
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"{self.namespace}_{subsystem}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            sources = list(self._stats_sources.items())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for subsystem, get_stats in sources:
+            lines.extend(self._render_stats(subsystem, get_stats))
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats, prefix=""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}".replace(".", "_").replace("-", "_").replace(" ", "_")
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
+
+
+class TurnTracker:
+    """Recent voice turns keyed by correlation id, with the duration of each stage they went through"""
+
+    def __init__(self, max_turns=None):
+        self.max_turns = max_turns or int(os.getenv("METRICS_RECENT_TURNS", "200"))
+        self._turns = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, turn_id):
+        with self._lock:
+            self._turns[turn_id] = {"turn_id": turn_id, "started_at": time.time(), "stages": {}}
+            while len(self._turns) > self.max_turns:
+                self._turns.popitem(last=False)
+
+    def add(self, turn_id, stage, seconds):
+        with self._lock:
+            turn = self._turns.get(turn_id)
+            if turn is None:
+                return
+            # Repeated stages (audio frames, several LLM calls) accumulate
+            entry = turn["stages"].setdefault(stage, {"ms": 0.0, "count": 0})
+            entry["ms"] += seconds * 1000
+            entry["count"] += 1
+
+    def finish(self, turn_id):
+        with self._lock:
+            turn = self._turns.get(turn_id)
+            if turn is None or "total_ms" in turn:
+                return None
+            turn["total_ms"] = (time.time() - turn["started_at"]) * 1000
+            return turn["total_ms"] / 1000
+
+    def recent(self, limit=50):
+        with self._lock:
+            turns = list(self._turns.values())[-limit:]
+            return [dict(turn, stages=dict(turn["stages"])) for turn in reversed(turns)]
+
+
+_registry = MetricsRegistry()
+_turns = None
+_turns_lock = threading.Lock()
+_turn_ids = itertools.count(1)
+_process_tag = uuid.uuid4().hex[:8]
+
+STAGE_SECONDS = _registry.histogram("stage_duration_seconds", "Time spent in each voice-turn stage", ("stage", "op"))
+STAGE_ERRORS = _registry.counter("stage_errors_total", "Stages that raised", ("stage", "op"))
+TURN_SECONDS = _registry.histogram("turn_duration_seconds", "First audio (or request) to final emit per voice turn")
+TURNS = _registry.counter("turns_total", "Voice turns by outcome", ("outcome",))
+
+
+def get_registry():
+    return _registry
+
+
+def _get_turns():
+    # Built on first use so METRICS_* settings from .env (loaded in main) apply
+    global _turns
+    if _turns is None:
+        with _turns_lock:
+            if _turns is None:
+                _turns = TurnTracker()
+    return _turns
+
+
+def _log_spans():
+    return os.getenv("METRICS_LOG_SPANS", "false").lower() in ("1", "true", "yes")
+
+
+def new_turn_id():
+    """Short correlation id: process-unique prefix plus a counter"""
+    return f"{_process_tag}-{next(_turn_ids)}"
+
+
+def start_turn(turn_id=None):
+    turn_id = turn_id or new_turn_id()
+    _get_turns().start(turn_id)
+    return turn_id
+
+
+def bind_turn(turn_id):
+    """Make turn_id the correlation id for spans recorded by this green thread"""
+    return _current_turn.set(turn_id)
+
+
+def unbind_turn(token):
+    _current_turn.reset(token)
+
+
+def current_turn_id():
+    return _current_turn.get()
+
+
+def finish_turn(turn_id, outcome="ok"):
+    seconds = _get_turns().finish(turn_id)
+    if seconds is None:
+        return
+    TURN_SECONDS.observe(seconds)
+    TURNS.inc(outcome=outcome)
+    if _log_spans():
+        print(f"⏱️ turn={turn_id} finished in {seconds * 1000:.1f} ms ({outcome})")
+
+
+def observe(stage, seconds, op="", turn_id=None):
+    STAGE_SECONDS.observe(seconds, stage=stage, op=op)
+    turn_id = turn_id or _current_turn.get()
+    if turn_id:
+        _get_turns().add(turn_id, stage, seconds)
+        if _log_spans():
+            print(f"⏱️ turn={turn_id} stage={stage}{'/' + op if op else ''} {seconds * 1000:.1f} ms")
+
+
+@contextmanager
+def span(stage, op="", turn_id=None):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage, op=op)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started, op=op, turn_id=turn_id)
+
+
+def timed(stage, op=None):
+    """Decorator form of span(); op defaults to the function name"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, op or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recent_turns(limit=50):
+    return _get_turns().recent(limit)
+
+
+def render_metrics():
+    return _registry.render()
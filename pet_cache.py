@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_pet_name(name):
+    # pet_profile.name uses a case-insensitive collation, so match the same way
+    return " ".join(str(name or "").split()).casefold()
+
+
+class PetProfileCache:
+    """Read-through cache of each owner's pet rows, keyed by (owner, normalized name).
+
+    Invalidations advance a clock and stamp the owner with it. Fills read the clock before
+    querying and are dropped if the owner was stamped later, so a query that raced with a
+    write cannot put the pre-write rows back. Stamps are kept for at most max_owners owners;
+    evicting one (or invalidate_all) moves a watermark, and fills begun before it are dropped.
+    """
+
+    def __init__(self, max_owners=None, ttl_seconds=None):
+        self.max_owners = max_owners if max_owners is not None else int(os.getenv("PET_CACHE_MAX_OWNERS", "10000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("PET_CACHE_TTL_SECONDS", "300"))
+        self._owners = OrderedDict()  # owner -> (expires_at, {normalized name: row})
+        self._lock = threading.Lock()
+        self._clock = 0
+        self._invalidated = OrderedDict()  # owner -> clock of its latest invalidation, oldest first
+        self._forgotten = 0  # fills begun before this clock can't be checked per owner any more
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    @staticmethod
+    def _owner_key(owner):
+        return str(owner)
+
+    def get_owner(self, owner):
+        """Return {normalized name: row} for the owner, or None when not cached"""
+        key = self._owner_key(owner)
+        with self._lock:
+            entry = self._owners.get(key)
+            if entry and entry[0] > time.time():
+                self._owners.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._owners[key]
+            self.misses += 1
+            return None
+
+    def generation(self, owner):
+        """Token to pass to put_owner; read it before loading the rows"""
+        with self._lock:
+            return self._clock
+
+    def put_owner(self, owner, pets_by_name, generation=None):
+        key = self._owner_key(owner)
+        with self._lock:
+            if generation is not None and (generation < self._forgotten
+                                           or self._invalidated.get(key, -1) > generation):
+                self.stale_fills += 1
+                return False
+            self._owners[key] = (time.time() + self.ttl_seconds, pets_by_name)
+            self._owners.move_to_end(key)
+            while len(self._owners) > self.max_owners:
+                self._owners.popitem(last=False)
+            return True
+
+    def invalidate_owner(self, owner):
+        key = self._owner_key(owner)
+        with self._lock:
+            self._owners.pop(key, None)
+            self._clock += 1
+            self._invalidated[key] = self._clock
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_owners:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+            self.invalidations += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._owners.clear()
+            self._clock += 1
+            self._invalidated.clear()
+            self._forgotten = self._clock
+            self.invalidations += 1
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "owners": len(self._owners),
+                "tracked_invalidations": len(self._invalidated),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_pet_cache = None
+_pet_cache_lock = threading.Lock()
+
+
+def get_pet_cache():
+    """Process-wide cache so every Database instance sees the same invalidations"""
+    global _pet_cache
+    if _pet_cache is None:
+        with _pet_cache_lock:
+            if _pet_cache is None:
+                _pet_cache = PetProfileCache()
+    return _pet_cache
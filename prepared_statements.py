@@ -0,0 +1,164 @@
+import os
+import re
+import threading
+import weakref
+from functools import lru_cache
+
+import mysql.connector
+from mysql.connector import errorcode
+
+
+@lru_cache(maxsize=256)
+def insert_sql(table_name, columns):
+    """INSERT text for (table, column tuple), built once per shape"""
+    placeholders = ', '.join(['%s'] * len(columns))
+    columns_str = ', '.join(columns)
+    return f"INSERT INTO `{table_name}` ({columns_str}) VALUES ({placeholders})"
+
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _quote(identifier):
+    if not _IDENTIFIER_RE.match(identifier):
+        raise ValueError(f"Invalid SQL identifier: {identifier!r}")
+    return f"`{identifier}`"
+
+
+def where_clause(where):
+    """Turn {column: value} into (shape, params); lists become IN, None becomes IS NULL.
+
+    The shape is hashable so statements built from it can be cached and prepared.
+    """
+    shape = []
+    params = []
+    for column, value in where.items():
+        if value is None:
+            shape.append((column, "null", 0))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            values = list(value)
+            if not values:
+                raise ValueError(f"Empty IN list for column {column!r}")
+            shape.append((column, "in", len(values)))
+            params.extend(values)
+        else:
+            shape.append((column, "eq", 1))
+            params.append(value)
+    return tuple(shape), tuple(params)
+
+
+def _where_sql(shape):
+    parts = []
+    for column, kind, count in shape:
+        if kind == "null":
+            parts.append(f"{_quote(column)} IS NULL")
+        elif kind == "in":
+            parts.append(f"{_quote(column)} IN ({', '.join(['%s'] * count)})")
+        else:
+            parts.append(f"{_quote(column)} = %s")
+    return " AND ".join(parts)
+
+
+@lru_cache(maxsize=256)
+def select_for_update_sql(table_name, columns, where_shape):
+    """Lock matching rows and read only the given columns"""
+    column_sql = ', '.join(_quote(column) for column in columns)
+    return f"SELECT {column_sql} FROM {_quote(table_name)} WHERE {_where_sql(where_shape)} FOR UPDATE"
+
+
+@lru_cache(maxsize=256)
+def update_sql(table_name, set_columns, where_shape):
+    set_sql = ', '.join(f"{_quote(column)} = %s" for column in set_columns)
+    return f"UPDATE {_quote(table_name)} SET {set_sql} WHERE {_where_sql(where_shape)}"
+
+
+def _raw_connection(connection):
+    # Pooled wrappers are recreated on every checkout; statements live on the underlying connection
+    return getattr(connection, "_cnx", None) or connection
+
+
+class StatementRegistry:
+    """Prepares each hot statement once per pooled connection and reuses the server-side handle"""
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.getenv("MYSQL_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self._cursors = weakref.WeakKeyDictionary()  # raw connection -> {sql: prepared cursor}
+        self._lock = threading.Lock()
+        self.prepared = 0
+        self.reused = 0
+        self.reprepared = 0
+
+    def _statements_for(self, raw):
+        with self._lock:
+            statements = self._cursors.get(raw)
+            if statements is None:
+                statements = {}
+                self._cursors[raw] = statements
+            return statements
+
+    def _cursor_for(self, connection, sql):
+        raw = _raw_connection(connection)
+        statements = self._statements_for(raw)
+        cursor = statements.get(sql)
+        if cursor is None:
+            cursor = raw.cursor(prepared=True)
+            statements[sql] = cursor
+            self.prepared += 1
+        else:
+            self.reused += 1
+        return cursor
+
+    def forget(self, connection):
+        with self._lock:
+            self._cursors.pop(_raw_connection(connection), None)
+
+    def execute(self, connection, sql, params=()):
+        """Execute sql on its prepared cursor for this connection and return the cursor.
+
+        The cursor is owned by the registry: fetch what you need and do not close it.
+        Falls back to a plain cursor when prepared statements are disabled.
+        """
+        if not self.enabled:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            return cursor
+
+        cursor = self._cursor_for(connection, sql)
+        try:
+            cursor.execute(sql, params)
+        except mysql.connector.Error as e:
+            if e.errno != errorcode.ER_UNKNOWN_STMT_HANDLER:
+                self.forget(connection)
+                raise
+            # Server dropped the handle (reconnect / session reset): prepare again once
+            self.forget(connection)
+            self.reprepared += 1
+            cursor = self._cursor_for(connection, sql)
+            cursor.execute(sql, params)
+        return cursor
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "connections": len(self._cursors),
+                "prepared": self.prepared,
+                "reused": self.reused,
+                "reprepared": self.reprepared,
+                "insert_shapes_cached": insert_sql.cache_info().currsize,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_statement_registry():
+    """Process-wide registry; pooled connections are shared by every Database instance"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = StatementRegistry()
+    return _registry
@@ -100,5 +100,34 @@ prompt_dict = {
         - Keep responses informative but concise
     
         For the following pet health query:
+        """,
+
+        "FUSED_INTENT_PROMPT": """
+        Classify the user's message into exactly one intent and, in the same reply, extract the fields that intent needs.
+
+        Intents:
+        1. CREATE_PROFILE: User wants to create or update a pet or user profile.
+        2. CARE_ROUTINE: Questions or commands about pet care schedules or routines.
+        3. HEALTH: Questions about pet health or symptoms.
+        4. GENERAL: Chit-chat or unrelated queries.
+
+        Fields per intent (use null for anything not mentioned):
+        - CREATE_PROFILE: {"name": string | null, "breed": string | null, "age": string | null}
+        - CARE_ROUTINE: {"pet_name": string | null, "care_type": string | null, "description": string | null,
+                         "frequency": string | null, "time_of_day": "HH:MM" | null}
+        - HEALTH: {"pet_name": string | null, "query_category": string, "symptoms": string | null,
+                   "urgency": "low" | "medium" | "high"}
+        - GENERAL: {}
+
+        Respond with JSON only, no explanation:
+        {"intent": "<INTENT>", "fields": {...}}
+
+        Examples:
+        - "Create a profile for Bella, a 2-year-old Shih Tzu." -> {"intent": "CREATE_PROFILE", "fields": {"name": "Bella", "breed": "Shih Tzu", "age": "2 years"}}
+        - "Feed Max twice daily at 8am and 6pm" -> {"intent": "CARE_ROUTINE", "fields": {"pet_name": "Max", "care_type": "feeding", "description": "Feed Max", "frequency": "twice daily", "time_of_day": "08:00"}}
+        - "Is vomiting normal for cats?" -> {"intent": "HEALTH", "fields": {"pet_name": null, "query_category": "digestive", "symptoms": "vomiting", "urgency": "low"}}
+        - "Who won the football match?" -> {"intent": "GENERAL", "fields": {}}
+
+        User message:
         """
 }
\ No newline at end of file
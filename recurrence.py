@@ -0,0 +1,152 @@
+import calendar
+import re
+from datetime import datetime, timedelta
+
+# Compact recurrence: "<unit><interval>[@HH:MM,HH:MM...]" with unit H(ours), D(ays), W(eeks), M(onths)
+# e.g. "D1@08:00,18:00" = twice daily, "W2@09:00" = every other week, "H6" = every six hours
+UNITS = ("H", "D", "W", "M")
+DEFAULT_TIME = "09:00"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_RECURRENCE_RE = re.compile(r"^([HDWM])(\d+)(?:@([\d:,]+))?$")
+_EVERY_N_RE = re.compile(r"every\s+(\d+|other|two|three|four|six|eight|twelve)\s+(hour|day|week|month)s?")
+# Also accepts MySQL TIME values, which arrive as timedelta and stringify to "8:00:00"
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*(am|pm)?\s*$", re.IGNORECASE)
+
+_NUMBER_WORDS = {"other": 2, "two": 2, "three": 3, "four": 4, "six": 6, "eight": 8, "twelve": 12}
+_UNIT_WORDS = {"hour": "H", "day": "D", "week": "W", "month": "M"}
+
+# Default times when time_of_day or the frequency names a part of the day instead of a clock time
+_PART_OF_DAY = (("morning", "08:00"), ("noon", "12:00"), ("afternoon", "14:00"),
+                ("evening", "18:00"), ("night", "21:00"), ("bedtime", "21:00"))
+
+
+def parse_time_of_day(value):
+    """'8am', '18:30', '6 PM' -> 'HH:MM', or None"""
+    if not value:
+        return None
+    match = _TIME_RE.match(str(value))
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _spread_times(first, count):
+    """count slots per day starting at first, evenly spaced across the waking day (12 h window)"""
+    hour, minute = map(int, first.split(":"))
+    start = hour * 60 + minute
+    step = 12 * 60 // max(count - 1, 1) if count > 1 else 0
+    return [f"{((start + i * step) // 60) % 24:02d}:{(start + i * step) % 60:02d}" for i in range(count)]
+
+
+def parse_recurrence(frequency, time_of_day=None):
+    """Normalize free-text frequency ('twice daily', 'every morning', ...) into the compact form"""
+    text = " ".join(str(frequency or "").lower().split())
+    explicit_time = parse_time_of_day(time_of_day)
+
+    unit, interval, per_day = "D", 1, 1
+    every_n = _EVERY_N_RE.search(text)
+    if every_n:
+        count = every_n.group(1)
+        interval = int(count) if count.isdigit() else _NUMBER_WORDS[count]
+        unit = _UNIT_WORDS[every_n.group(2)]
+    elif "hourly" in text or "every hour" in text:
+        unit = "H"
+    elif "biweekly" in text or "fortnight" in text:
+        unit, interval = "W", 2
+    elif "weekly" in text or "week" in text:
+        unit = "W"
+    elif "monthly" in text or "month" in text:
+        unit = "M"
+    elif "yearly" in text or "annual" in text:
+        unit, interval = "M", 12
+    elif "twice" in text or "two times" in text:
+        per_day = 2
+    elif "three times" in text or "thrice" in text:
+        per_day = 3
+
+    interval = max(interval, 1)
+    if unit == "H":
+        return f"H{interval}"
+
+    if explicit_time:
+        times = _spread_times(explicit_time, per_day) if unit == "D" else [explicit_time]
+        return f"{unit}{interval}@{','.join(times)}"
+
+    # A worded time_of_day ('evening', 'morning and evening') wins over words in the frequency
+    parts = _parts_of_day(time_of_day) or _parts_of_day(text)
+    if unit == "D" and len(parts) > 1:
+        times = parts
+    else:
+        first = parts[0] if parts else DEFAULT_TIME
+        times = _spread_times(first, per_day) if unit == "D" else [first]
+    return f"{unit}{interval}@{','.join(times)}"
+
+
+def _parts_of_day(text):
+    """Default times for the parts of the day named in text, in day order"""
+    words = set(re.findall(r"[a-z]+", str(text or "").lower()))
+    return sorted({default for word, default in _PART_OF_DAY if word in words})
+
+
+def split_recurrence(recurrence):
+    match = _RECURRENCE_RE.match(recurrence or "")
+    if not match:
+        raise ValueError(f"Invalid recurrence: {recurrence!r}")
+    unit, interval, times = match.group(1), int(match.group(2)), match.group(3)
+    slots = sorted(tuple(map(int, t.split(":"))) for t in times.split(",")) if times else []
+    return unit, interval, slots
+
+
+def _add_months(moment, months):
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def next_occurrence(recurrence, after):
+    """Earliest fire time strictly after `after` (naive server-local datetimes)"""
+    unit, interval, slots = split_recurrence(recurrence)
+    after = after.replace(second=0, microsecond=0)
+
+    if unit == "H":
+        return after + timedelta(hours=interval)
+
+    slots = slots or [tuple(map(int, DEFAULT_TIME.split(":")))]
+    # Later slot on the same day
+    for hour, minute in slots:
+        candidate = after.replace(hour=hour, minute=minute)
+        if candidate > after:
+            return candidate
+
+    # Otherwise the first slot of the next period
+    hour, minute = slots[0]
+    base = after.replace(hour=hour, minute=minute)
+    if unit == "D":
+        return base + timedelta(days=interval)
+    if unit == "W":
+        return base + timedelta(weeks=interval)
+    return _add_months(base, interval)
+
+
+def as_datetime(value):
+    """Accept datetimes or 'YYYY-MM-DD HH:MM:SS' strings (as written by Action)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def first_occurrence(recurrence, now=None):
+    """First fire time at or after now (a slot later today counts)"""
+    now = now or datetime.now()
+    if recurrence.startswith("H"):
+        return next_occurrence(recurrence, now)
+    return next_occurrence(recurrence, now - timedelta(minutes=1))
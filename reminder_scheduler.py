@@ -0,0 +1,227 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db_pool import PoolExhaustedError
+from recurrence import DATETIME_FORMAT, as_datetime, first_occurrence, next_occurrence, parse_recurrence
+
+
+class ReminderScheduler:
+    """Min-heap of active care routines ordered by next fire time; pushes due reminders to owners.
+
+    The worker sleeps until the earliest entry is due (or an earlier one is added), so there is
+    no per-tick table polling. Updates push a fresh heap entry and bump the routine's version;
+    superseded entries are skipped when popped (lazy deletion), keeping every change O(log n).
+
+    Only routines due within REMINDER_HORIZON_HOURS are held in memory. They are loaded with the
+    next_due_at range query and the window is topped up every half horizon; a routine whose next
+    occurrence falls past the window is dropped until a later refill picks it up again.
+    """
+
+    # After a failed load, try again this soon
+    RETRY_SECONDS = 60
+
+    def __init__(self, db, emit_reminder, max_batch=1000, horizon_hours=None, max_load=100000):
+        self.db = db
+        self.emit_reminder = emit_reminder  # emit_reminder(owner, payload)
+        self.max_batch = max_batch
+        self.horizon = timedelta(hours=float(horizon_hours or os.getenv("REMINDER_HORIZON_HOURS", "24")))
+        self.max_load = max_load
+
+        self._heap = []  # (fire_at timestamp, seq, routine_id, version)
+        self._routines = {}  # routine_id -> (version, routine dict)
+        self._seq = itertools.count()
+        self._versions = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._loaded_until = None  # datetime up to which due routines have been loaded
+        self._next_load = 0.0  # time.time() of the next refill
+
+        self.fired = 0
+        self.loaded = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def load(self):
+        """Load active routines due within the horizon; heapify keeps startup O(n) for large tables"""
+        now = datetime.now()
+        until = now + self.horizon
+        try:
+            routines = self.db.get_due_routines(until.strftime(DATETIME_FORMAT), limit=self.max_load)
+        except PoolExhaustedError as e:
+            print(f"⚠️ {e}")
+            routines = None
+        if routines is None:
+            print("⚠️ Could not load care routines; retrying shortly")
+            self._next_load = time.time() + self.RETRY_SECONDS
+            return
+        refill_in = max(self.horizon.total_seconds() / 2, 1.0)
+        if len(routines) >= self.max_load:
+            # Stop short of the last row and come back soon for the rest
+            until = as_datetime(routines[-1]["next_due_at"]) - timedelta(seconds=1)
+            refill_in = self.RETRY_SECONDS
+            print(f"⚠️ More than {self.max_load} routines due; loading up to {until}")
+
+        entries = []
+        with self._cond:
+            for routine in routines:
+                # Routines already held were (re)scheduled in memory; their row may lag behind
+                if routine["id"] in self._routines:
+                    continue
+                version, prepared = self._prepare(routine, now)
+                if prepared is None or prepared["fire_at"] > until:
+                    continue
+                self._routines[routine["id"]] = (version, prepared)
+                entries.append((prepared["fire_at"].timestamp(), next(self._seq), routine["id"], version))
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+            self._loaded_until = until
+            self._next_load = time.time() + refill_in
+            self.loaded += len(entries)
+            self._cond.notify_all()
+        print(f"⏰ Reminder scheduler loaded {len(entries)} routines due before {until:%Y-%m-%d %H:%M}")
+
+    def _prepare(self, routine, now):
+        routine = dict(routine)
+        try:
+            routine.setdefault("recurrence", None)
+            if not routine["recurrence"]:
+                routine["recurrence"] = parse_recurrence(routine.get("frequency"), routine.get("time_of_day"))
+            # Prefer the materialized next_due_at; overdue rows fire straight away
+            routine["fire_at"] = as_datetime(routine.get("next_due_at")) or first_occurrence(routine["recurrence"], now)
+        except ValueError as e:
+            print(f"Skipping routine {routine.get('id')}: {e}")
+            return None, None
+        # Globally unique versions so a cancelled-then-rescheduled routine can't revive old entries
+        return next(self._versions), routine
+
+    def schedule(self, routine):
+        """Add or replace one routine (new CARE_ROUTINE, or a changed one)"""
+        if not routine.get("is_active", True):
+            self.cancel(routine["id"])
+            return
+        with self._cond:
+            version, prepared = self._prepare(routine, datetime.now())
+            if prepared is None:
+                return
+            self._routines[routine["id"]] = (version, prepared)
+            entry = (prepared["fire_at"].timestamp(), next(self._seq), routine["id"], version)
+            heapq.heappush(self._heap, entry)
+            self._maybe_compact()
+            # Only wake the worker if this is now the earliest reminder
+            if self._heap[0] is entry:
+                self._cond.notify_all()
+
+    def cancel(self, routine_id):
+        with self._cond:
+            # Its heap entries become stale and are dropped when they surface
+            self._routines.pop(routine_id, None)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        # Rebuild once stale entries outnumber live ones so the heap stays O(active routines)
+        if len(self._heap) > 2 * len(self._routines) + 1024:
+            self._heap = [
+                entry for entry in self._heap
+                if entry[2] in self._routines and self._routines[entry[2]][0] == entry[3]
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self):
+        """Wait until something is due, then pop up to max_batch due routines.
+
+        Returns an empty list when the horizon needs a refill, None once stopped.
+        """
+        with self._cond:
+            while not self._stopped:
+                until_load = self._next_load - time.time()
+                if until_load <= 0:
+                    return []
+                if not self._heap:
+                    self._cond.wait(timeout=until_load)
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._cond.wait(timeout=min(delay, until_load))
+                    continue
+
+                due = []
+                now = time.time()
+                current_time = datetime.now()
+                while self._heap and self._heap[0][0] <= now and len(due) < self.max_batch:
+                    _, _, routine_id, version = heapq.heappop(self._heap)
+                    current = self._routines.get(routine_id)
+                    if not current or current[0] != version:
+                        continue
+                    routine = current[1]
+                    fired_at = routine["fire_at"]
+                    # Skip missed slots (e.g. after downtime) instead of firing a burst of catch-ups
+                    routine["fire_at"] = next_occurrence(routine["recurrence"], max(fired_at, current_time))
+                    if self._loaded_until and routine["fire_at"] > self._loaded_until:
+                        # Past the window: next_due_at is persisted below and a refill reloads it
+                        del self._routines[routine_id]
+                    else:
+                        heapq.heappush(self._heap, (routine["fire_at"].timestamp(), next(self._seq), routine_id, version))
+                    due.append((routine, fired_at))
+                if due:
+                    return due
+            return None
+
+    def _run(self):
+        self.load()
+        while True:
+            due = self._pop_due()
+            if due is None:
+                break
+            for routine, fired_at in due:
+                self._deliver(routine, fired_at)
+            if due:
+                self._persist(due)
+            if time.time() >= self._next_load:
+                self.load()
+
+    def _deliver(self, routine, fired_at):
+        payload = {
+            "routine_id": routine["id"],
+            "pet_id": routine.get("pet_id"),
+            "pet_name": routine.get("pet_name"),
+            "care_type": routine.get("care_type"),
+            "description": routine.get("description"),
+            "due_at": fired_at.isoformat(),
+        }
+        try:
+            self.emit_reminder(routine.get("owner"), payload)
+            self.fired += 1
+        except Exception as e:
+            print(f"Error delivering reminder {routine['id']}: {e}")
+
+    def _persist(self, due):
+        # One bulk UPDATE per batch keeps notifications.next_due_at in step with the heap
+        self.db.advance_routines([
+            (routine["id"], routine["fire_at"].strftime(DATETIME_FORMAT)) for routine, _ in due
+        ])
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "active_routines": len(self._routines),
+                "heap_size": len(self._heap),
+                "loaded": self.loaded,
+                "loaded_until": self._loaded_until.isoformat() if self._loaded_until else None,
+                "fired": self.fired,
+                "next_fire_in_seconds": (self._heap[0][0] - time.time()) if self._heap else None,
+            }
@@ -0,0 +1,51 @@
+"""One-off migration: index logs for the per-pet HEALTH history lookup.
+
+Database.get_recent_health_queries warms a pet's conversation memory with
+WHERE table_name = 'health_queries' AND record_id = ? ORDER BY id DESC LIMIT n; without
+this index every cold pet scans the whole audit table. Safe to re-run.
+
+    python scripts/add_health_history_index.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import Database
+
+INDEX_NAME = "idx_logs_table_record"
+INDEX_SQL = f"CREATE INDEX {INDEX_NAME} ON logs (table_name, record_id, id)"
+
+
+def migrate_schema(db, dry_run=False):
+    has_index = db.execute_query(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'logs' AND INDEX_NAME = %s LIMIT 1",
+        (INDEX_NAME,),
+        fetch_one=True,
+    )
+    if has_index:
+        print(f"Index {INDEX_NAME} already exists")
+        return
+    if dry_run:
+        print(f"Would create index {INDEX_NAME} (dry run)")
+        return
+    print(f"Creating index {INDEX_NAME}")
+    db.execute_query(INDEX_SQL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report without changing the schema")
+    args = parser.parse_args()
+
+    migrate_schema(Database(), args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
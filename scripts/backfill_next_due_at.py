@@ -0,0 +1,121 @@
+"""One-off migration: add notifications.recurrence / next_due_at and backfill existing rows.
+
+Adds the columns and the (is_active, next_due_at) index if they are missing, then parses the
+free-text frequency/time_of_day of every row without a recurrence, in id-ordered batches.
+Safe to re-run; rows that already have a recurrence are left alone. --dry-run reports the
+missing schema pieces and how many rows would be backfilled, without writing anything.
+--reparse re-runs the parser over every row after a parser fix and rewrites only the rows whose
+recurrence changes (and their next_due_at); restart the server afterwards so the reminder
+scheduler drops the schedules it already holds.
+
+    python scripts/backfill_next_due_at.py [--batch-size 1000] [--dry-run] [--reparse]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import Database
+from recurrence import DATETIME_FORMAT, first_occurrence, parse_recurrence
+
+COLUMNS = {
+    "recurrence": "ALTER TABLE notifications ADD COLUMN recurrence VARCHAR(64) NULL",
+    "next_due_at": "ALTER TABLE notifications ADD COLUMN next_due_at DATETIME NULL",
+}
+INDEX_NAME = "idx_notifications_due"
+INDEX_SQL = f"CREATE INDEX {INDEX_NAME} ON notifications (is_active, next_due_at)"
+
+
+def migrate_schema(db, dry_run=False):
+    """Add whatever is missing (or only report it on a dry run); returns the columns now present"""
+    existing = {
+        row[0] for row in db.execute_query(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'notifications'",
+            fetch_all=True,
+        ) or []
+    }
+    for column, ddl in COLUMNS.items():
+        if column in existing:
+            continue
+        if dry_run:
+            print(f"Would add notifications.{column} (dry run)")
+            continue
+        print(f"Adding notifications.{column}")
+        db.execute_query(ddl)
+        existing.add(column)
+
+    has_index = db.execute_query(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'notifications' AND INDEX_NAME = %s LIMIT 1",
+        (INDEX_NAME,),
+        fetch_one=True,
+    )
+    if not has_index:
+        if dry_run:
+            print(f"Would create index {INDEX_NAME} (dry run)")
+        else:
+            print(f"Creating index {INDEX_NAME}")
+            db.execute_query(INDEX_SQL)
+    return existing
+
+
+def backfill(db, batch_size, dry_run, has_recurrence=True, reparse=False):
+    # Before the migration every row still needs a recurrence
+    pending = "recurrence IS NULL" if has_recurrence and not reparse else "1 = 1"
+    current = "recurrence" if has_recurrence else "NULL"
+    last_id = 0
+    total = 0
+    unparsed = 0
+    while True:
+        rows = db.execute_query(
+            f"SELECT id, frequency, time_of_day, {current} FROM notifications "
+            f"WHERE id > %s AND {pending} ORDER BY id LIMIT %s",
+            (last_id, batch_size),
+            fetch_all=True,
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        recurrences = []
+        next_due = []
+        for routine_id, frequency, time_of_day, existing in rows:
+            try:
+                recurrence = parse_recurrence(frequency, time_of_day)
+            except ValueError:
+                unparsed += 1
+                continue
+            if recurrence == existing:
+                continue
+            recurrences.append((routine_id, recurrence))
+            next_due.append((routine_id, first_occurrence(recurrence).strftime(DATETIME_FORMAT)))
+
+        if not dry_run:
+            db.set_routine_recurrences(recurrences)
+            db.advance_routines(next_due)
+        total += len(recurrences)
+        print(f"{'Would backfill' if dry_run else 'Backfilled'} {total} rows (last id {last_id})")
+
+    print(f"Done: {total} rows {'would be ' if dry_run else ''}backfilled, {unparsed} could not be parsed{' (dry run)' if dry_run else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="report schema changes and parse rows without writing")
+    parser.add_argument("--reparse", action="store_true", help="also re-parse rows that already have a recurrence")
+    args = parser.parse_args()
+
+    db = Database()
+    columns = migrate_schema(db, args.dry_run)
+    backfill(db, args.batch_size, args.dry_run, has_recurrence="recurrence" in columns, reparse=args.reparse)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Offline evaluation of the local intent classifier.
+
+Reads labelled transcripts (JSON lines with "text" and "label") and reports
+accuracy plus the share of turns that would skip the INTENT_PROMPT LLM call.
+
+By default three splits are reported: intent_samples.jsonl and intent_samples_dev.jsonl, which
+the keyword weights and the threshold were tuned against, and intent_samples_test.jsonl, which
+was written before that tuning and must never be used for it. Only the held-out test numbers
+say how the classifier generalizes.
+
+    python scripts/evaluate_intent_classifier.py [samples.jsonl ...] [--threshold 0.75] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_classifier import INTENTS, IntentClassifier
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SPLITS = {
+    "tuning": os.path.join(SCRIPT_DIR, "intent_samples.jsonl"),
+    "dev": os.path.join(SCRIPT_DIR, "intent_samples_dev.jsonl"),
+    "held_out": os.path.join(SCRIPT_DIR, "intent_samples_test.jsonl"),
+}
+
+
+def load_samples(path):
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            samples.append((row["text"], row["label"].strip().upper()))
+    return samples
+
+
+def evaluate(samples, threshold):
+    classifier = IntentClassifier(threshold=threshold)
+    correct = 0
+    confident = 0
+    confident_correct = 0
+    confusion = Counter()
+    misses = []
+
+    for text, label in samples:
+        intent, confidence = classifier.classify(text)
+        confusion[(label, intent)] += 1
+        if intent == label:
+            correct += 1
+        if classifier.is_confident(confidence):
+            confident += 1
+            if intent == label:
+                confident_correct += 1
+            else:
+                misses.append({"text": text, "label": label, "predicted": intent, "confidence": round(confidence, 3)})
+
+    total = len(samples)
+    return {
+        "samples": total,
+        "threshold": threshold,
+        "accuracy": correct / total if total else 0.0,
+        "local_accuracy": confident_correct / confident if confident else 0.0,
+        "llm_calls_avoided": confident / total if total else 0.0,
+        # Routed end to end: local answers where confident, LLM (assumed correct) otherwise
+        "pipeline_accuracy": (confident_correct + total - confident) / total if total else 0.0,
+        "confusion": {f"{label}->{predicted}": count for (label, predicted), count in sorted(confusion.items())},
+        "confident_misses": misses,
+    }
+
+
+def print_report(name, report):
+    print(f"== {name}")
+    print(f"Samples:            {report['samples']}")
+    print(f"Threshold:          {report['threshold']:.2f}")
+    print(f"Top-1 accuracy:     {report['accuracy']:.1%}")
+    print(f"Local accuracy:     {report['local_accuracy']:.1%} (confident predictions only)")
+    print(f"LLM calls avoided:  {report['llm_calls_avoided']:.1%}")
+    print(f"Pipeline accuracy:  {report['pipeline_accuracy']:.1%} (assuming the LLM fallback is correct)")
+    print("Confusion (label->predicted):")
+    for key, count in report["confusion"].items():
+        print(f"  {key}: {count}")
+    if report["confident_misses"]:
+        print("Confident misses:")
+        for miss in report["confident_misses"]:
+            print(f"  [{miss['label']} -> {miss['predicted']} @ {miss['confidence']}] {miss['text']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", nargs="*", help="sample files (default: the tuning, dev and held-out test splits)")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75")))
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    splits = {os.path.basename(path): path for path in args.samples} if args.samples else DEFAULT_SPLITS
+    reports = {name: evaluate(load_samples(path), args.threshold) for name, path in splits.items()}
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for i, (name, report) in enumerate(reports.items()):
+        if i:
+            print()
+        print_report(name, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from functools import partial
+
+from speech_processor import SpeechProcessor
+
+
+class SessionManager:
+    """Owns one SpeechProcessor (upstream stream + callbacks + state) per socket SID"""
+
+    def __init__(self, ws_handler, on_transcription_result, on_ai_response_result, action=None,
+                 on_ai_response_delta=None, on_audio_backpressure=None):
+        self.ws_handler = ws_handler
+        self.on_transcription_result = on_transcription_result
+        self.on_ai_response_result = on_ai_response_result
+        self.on_ai_response_delta = on_ai_response_delta
+        self.on_audio_backpressure = on_audio_backpressure
+        # A single Action (and its DB pool / HTTP client) is shared by every session
+        self.action = action
+
+    def create_session(self, sid):
+        """Register a client and give it its own speech processor bound to its SID"""
+        session = self.ws_handler.handle_connection(sid)
+        session["processor"] = SpeechProcessor(
+            on_transcription_result=partial(self.on_transcription_result, sid),
+            on_ai_response_result=partial(self.on_ai_response_result, sid),
+            action=self.action,
+            on_ai_response_delta=partial(self.on_ai_response_delta, sid) if self.on_ai_response_delta else None,
+            on_backpressure=partial(self.on_audio_backpressure, sid) if self.on_audio_backpressure else None,
+        )
+        print(f"🟢 Session created for SID: {sid} ({len(self.ws_handler.active_connections)} active)")
+        return session
+
+    def get_processor(self, sid):
+        session = self.ws_handler.get_session(sid)
+        if not session:
+            return None
+        return session.get("processor")
+
+    def get_user_id(self, sid):
+        session = self.ws_handler.get_session(sid)
+        if not session:
+            return None
+        return session.get("user_id")
+
+    def close_session(self, sid):
+        """Stop the client's upstream stream and forget its state"""
+        session = self.ws_handler.handle_disconnection(sid)
+        if not session:
+            return
+        processor = session.get("processor")
+        if processor and processor.is_streaming:
+            processor.close_stream()
+        print(f"🔴 Session closed for SID: {sid} ({len(self.ws_handler.active_connections)} active)")
+
+    def close_all(self):
+        for sid in list(self.ws_handler.active_connections):
+            self.close_session(sid)
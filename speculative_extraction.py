@@ -0,0 +1,293 @@
+import contextvars
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from difflib import SequenceMatcher
+
+from action import EXTRACTION_PROMPTS
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Extraction branches summed over every session for /metrics; per-session counts live on each extractor
+_extraction_totals = Counter()
+_extraction_totals_lock = threading.Lock()
+
+# Partial-transcript speculation summed over every session for /metrics
+_partial_totals = Counter()
+_partial_totals_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("SPECULATIVE_WORKERS", "8")),
+                    thread_name_prefix="speculative",
+                )
+    return _executor
+
+
+def _add_extraction_totals(kind, intent):
+    with _extraction_totals_lock:
+        _extraction_totals[f"{kind}_{intent.lower()}"] += 1
+        _extraction_totals[kind] += 1
+
+
+def get_extraction_totals():
+    """launched / used / wasted branch counts, overall and per intent"""
+    with _extraction_totals_lock:
+        totals = dict(_extraction_totals)
+    launched = totals.get("launched", 0)
+    totals["wasted_fraction"] = totals.get("wasted", 0) / launched if launched else 0.0
+    return totals
+
+
+def parse_intent_thresholds(spec, default_min_score):
+    """Parse "HEALTH:0.2,CARE_ROUTINE" into {intent: min_score}"""
+    thresholds = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        intent, _, min_score = item.partition(":")
+        intent = intent.strip().upper()
+        if intent not in EXTRACTION_PROMPTS:
+            print(f"Ignoring speculative intent without an extraction prompt: {intent}")
+            continue
+        thresholds[intent] = float(min_score) if min_score else default_min_score
+    return thresholds
+
+
+class SpeculativeExtractor:
+    """Runs extraction prompts for the likeliest intents while the intent call is in flight"""
+
+    def __init__(self, action, enabled=None, intent_thresholds=None, max_branches=None):
+        if enabled is None:
+            enabled = os.getenv("SPECULATIVE_EXTRACTION", "false").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.action = action
+        if intent_thresholds is None:
+            intent_thresholds = parse_intent_thresholds(
+                os.getenv("SPECULATIVE_INTENTS", "CREATE_PROFILE,CARE_ROUTINE,HEALTH"),
+                float(os.getenv("SPECULATIVE_MIN_SCORE", "0.2")),
+            )
+        # Only intents listed here are ever speculated on, each with its own minimum local score
+        self.intent_thresholds = intent_thresholds
+        self.max_branches = max_branches if max_branches is not None else int(os.getenv("SPECULATIVE_MAX_BRANCHES", "1"))
+
+        self.launched = Counter()
+        self.used = Counter()
+        self.wasted = Counter()
+
+    def pick_intents(self, probabilities):
+        """Likeliest enabled intents whose local score clears their threshold"""
+        candidates = [
+            intent for intent, score in sorted(probabilities.items(), key=lambda item: item[1], reverse=True)
+            if intent in self.intent_thresholds and score >= self.intent_thresholds[intent]
+        ]
+        return candidates[:self.max_branches]
+
+    def start(self, transcript, probabilities):
+        """Launch extraction branches; returns {intent: future}"""
+        if not self.enabled:
+            return {}
+
+        branches = {}
+        executor = _get_executor()
+        for intent in self.pick_intents(probabilities):
+            # Carry the turn's correlation id into the worker so its spans are attributed
+            branches[intent] = executor.submit(contextvars.copy_context().run,
+                                               self.action.extract_fields, intent, transcript)
+            self.launched[intent] += 1
+            _add_extraction_totals("launched", intent)
+        if branches:
+            print(f"🔮 Speculative extraction started for: {', '.join(branches)}")
+        return branches
+
+    def resolve(self, branches, intent):
+        """Return the winning branch's fields (or None) and drop the losers"""
+        intent = (intent or "").strip().upper()
+        fields = None
+        for branch_intent, future in branches.items():
+            if branch_intent == intent:
+                try:
+                    fields = future.result()
+                    self.used[branch_intent] += 1
+                    _add_extraction_totals("used", branch_intent)
+                except Exception as e:
+                    print(f"Speculative extraction for {branch_intent} failed: {e}")
+                    self.wasted[branch_intent] += 1
+                    _add_extraction_totals("wasted", branch_intent)
+            else:
+                # Not started yet: cancel outright; already running: let it finish and discard
+                future.cancel()
+                self.wasted[branch_intent] += 1
+                _add_extraction_totals("wasted", branch_intent)
+        return fields
+
+    def get_stats(self):
+        return {
+            "launched": dict(self.launched),
+            "used": dict(self.used),
+            "wasted": dict(self.wasted),
+            "wasted_total": sum(self.wasted.values()),
+        }
+
+
+def transcript_words(text):
+    """Lowercased words without punctuation, so formatting differences in finals don't count"""
+    return _WORD_RE.findall((text or "").lower())
+
+
+def transcript_similarity(a, b):
+    """Word-level similarity in [0, 1] between two transcripts"""
+    words_a, words_b = transcript_words(a), transcript_words(b)
+    if not words_a and not words_b:
+        return 1.0
+    return SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+
+def _add_partial_totals(**amounts):
+    with _partial_totals_lock:
+        _partial_totals.update(amounts)
+
+
+def get_partial_totals():
+    with _partial_totals_lock:
+        totals = dict(_partial_totals)
+    decided = totals.get("reused", 0) + totals.get("redone", 0)
+    totals["reuse_rate"] = totals.get("reused", 0) / decided if decided else 0.0
+    return totals
+
+
+class PartialIntentSpeculator:
+    """Classifies stable partial transcripts while the user is still talking.
+
+    A partial is stable once it has min_words words and only extends the previous partial
+    (its last word may still change). Every stable partial that grew by min_growth words
+    since the last launch runs classify(text) in the background; the newer launch supersedes
+    the older one. At end of turn take(final) reuses the latest result when the final is
+    within match_threshold word similarity, and returns None otherwise so the caller redoes
+    it. classify sees the raw partial text; words are normalized only for the stability and
+    similarity checks. Extracted fields are only reused when the raw text matches exactly.
+    A launch still queued at end of turn, or not done within wait_ms, is abandoned in favour
+    of a fresh classification.
+    """
+
+    def __init__(self, classify, enabled=None, min_words=None, min_growth=None, match_threshold=None,
+                 wait_ms=None):
+        if enabled is None:
+            enabled = os.getenv("SPECULATIVE_INTENT", "false").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.classify = classify  # classify(text) -> (intent, fields)
+        self.min_words = int(min_words or os.getenv("SPECULATIVE_PARTIAL_MIN_WORDS", "4"))
+        self.min_growth = int(min_growth or os.getenv("SPECULATIVE_PARTIAL_MIN_GROWTH", "2"))
+        self.match_threshold = float(match_threshold or os.getenv("SPECULATIVE_MATCH_THRESHOLD", "0.85"))
+        self.wait_seconds = float(wait_ms or os.getenv("SPECULATIVE_INTENT_WAIT_MS", "1000")) / 1000
+
+        self._lock = threading.Lock()
+        self._previous = None  # words of the previous partial in this turn
+        self._current = None  # (words, text, future) of the latest launch in this turn
+        self._finished = None  # the launch frozen at end of turn, waiting for take()
+
+        self.started = 0
+        self.superseded = 0
+        self.reused = 0
+        self.redone = 0
+        self.timed_out = 0
+
+    def observe_partial(self, text):
+        """Feed a non-final transcript; may launch a classification. Never blocks"""
+        if not self.enabled:
+            return
+        words = transcript_words(text)
+        with self._lock:
+            previous, self._previous = self._previous, words
+            stable = (len(words) >= self.min_words and bool(previous)
+                      and words[:len(previous) - 1] == previous[:-1])
+            if not stable:
+                return
+            if self._current and len(words) - len(self._current[0]) < self.min_growth:
+                return
+            if self._current:
+                # Not started yet: cancel outright; already running: let it finish and discard
+                self._current[2].cancel()
+                self.superseded += 1
+                _add_partial_totals(superseded=1)
+            text = text.strip()
+            future = _get_executor().submit(contextvars.copy_context().run, self.classify, text)
+            self._current = (words, text, future)
+            self.started += 1
+            _add_partial_totals(started=1)
+
+    def end_turn(self):
+        """The STT service finalized the turn: keep its last launch for take(), start fresh"""
+        with self._lock:
+            if self._current:
+                if self._finished:
+                    self._finished[2].cancel()
+                self._finished = self._current
+            self._current = None
+            self._previous = None
+
+    def take(self, final_text):
+        """Return (intent, fields) from a matching speculation, or None if it must be redone"""
+        with self._lock:
+            launch = self._finished or self._current
+            self._finished = None
+            if launch is self._current:
+                self._current = None
+                self._previous = None
+        if launch is None:
+            return None
+
+        words, text, future = launch
+        similarity = transcript_similarity(" ".join(words), final_text)
+        result = None
+        if similarity < self.match_threshold:
+            future.cancel()
+        elif future.cancel():
+            # Still queued behind other sessions' launches: a fresh call is no slower
+            self._record_timeout()
+        else:
+            try:
+                result = future.result(timeout=self.wait_seconds)
+            except FutureTimeout:
+                self._record_timeout()
+            except Exception as e:
+                print(f"Speculative intent failed: {e}")
+
+        if not result or not result[0]:
+            self.redone += 1
+            _add_partial_totals(redone=1)
+            print(f"🔮 Partial-transcript intent discarded (similarity {similarity:.2f})")
+            return None
+        intent, fields = result
+        self.reused += 1
+        _add_partial_totals(reused=1)
+        print(f"🔮 Reusing partial-transcript intent: {intent} (similarity {similarity:.2f})")
+        # Slots like "9:30" only come out right from the exact final text
+        return intent, fields if text == (final_text or "").strip() else None
+
+    def _record_timeout(self):
+        self.timed_out += 1
+        _add_partial_totals(timed_out=1)
+
+    def get_stats(self):
+        decided = self.reused + self.redone
+        return {
+            "enabled": self.enabled,
+            "started": self.started,
+            "superseded": self.superseded,
+            "reused": self.reused,
+            "redone": self.redone,
+            "timed_out": self.timed_out,
+            "reuse_rate": self.reused / decided if decided else 0.0,
+        }
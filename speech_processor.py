@@ -5,124 +5,190 @@ import websockets
 import json
 import time
 import base64
+from collections import deque
 
+import metrics
 from action import Action
-from prompt_dict import prompt_dict
-from ai_generator import AIGenerator
+from audio_send_queue import AudioSendQueue
+from audio_transcoder import StreamingTranscoder, parse_audio_format
+from vad import VoiceActivityDetector, vad_settings
+from intent_classifier import INTENTS, IntentClassifier
+from action import EXTRACTION_PROMPTS
+from speculative_extraction import PartialIntentSpeculator, SpeculativeExtractor
+from stt_pool import get_stt_pool
+
+# pcm_s16le mono @ 16 kHz
+BYTES_PER_SAMPLE = 2
+BYTES_PER_SECOND = 16000 * BYTES_PER_SAMPLE
+# Reject anything larger than 10 s of audio in a single client frame
+MAX_CLIENT_FRAME_SECONDS = 10
+MAX_CLIENT_FRAME_BYTES = MAX_CLIENT_FRAME_SECONDS * BYTES_PER_SECOND
+
+
+def _flag(value):
+    """Client options arrive as JSON bools or strings; parse them like the env flags"""
+    return str(value).lower() in ("1", "true", "yes")
 
 
 class SpeechProcessor:
-    def __init__(self, on_transcription_result, on_ai_response_result):
-        self.ws = None
-        self.loop = None
-        self.thread = None
+    def __init__(self, on_transcription_result, on_ai_response_result, action=None, on_ai_response_delta=None,
+                 on_backpressure=None):
+        # Pooled upstream session; its websocket runs on the pool's shared event loop
+        self.upstream = None
+        self.upstream_ready = False
         self.api_key = os.getenv("ASSEMBLYAI_API_TOKEN")
         self.is_connected = False
         self.is_streaming = False
-        self._stop_event = None
+        self.binary_audio = False
+        self.stream_started_at = None
+        self._drain_task = None
+        # Ring buffer for audio that arrives before the upstream handshake completes
+        self._pending = deque()
+        self._pending_bytes = 0
+        self._pending_lock = threading.Lock()
+        self.max_pending_bytes = int(os.getenv("STT_HANDSHAKE_BUFFER_MS", "1000")) * BYTES_PER_SECOND // 1000
+        self.pending_dropped_bytes = 0
         self.on_transcription_result = on_transcription_result
         self.on_ai_response_result = on_ai_response_result
-        self.action = Action()
-
-    def start_stream(self):
+        self.on_ai_response_delta = on_ai_response_delta
+        self.on_backpressure = on_backpressure
+        # Frames are queued here and sent by a coroutine on the stream's loop, never inline
+        self.send_queue = None
+        # Optional per-session silence suppression in front of the queue
+        self.vad = None
+        # Clients may send other rates/layouts; they are converted to 16 kHz mono s16 before VAD
+        self.transcoder = None
+        self.client_frame_bytes = BYTES_PER_SAMPLE
+        self.max_client_frame_bytes = MAX_CLIENT_FRAME_BYTES
+        self.stream_responses = False
+        self.action = action or Action()
+        self.ai_generator = self.action.ai_generator
+        self.intent_classifier = IntentClassifier()
+        # One LLM call for intent + fields instead of intent, then extraction
+        self.fused_intent = os.getenv("FUSED_INTENT_EXTRACTION", "false").lower() in ("1", "true", "yes")
+        self.speculator = SpeculativeExtractor(self.action)
+        # Intent (and optionally fields) worked out from partial transcripts while the user talks
+        self.partial_speculator = PartialIntentSpeculator(self._classify_partial)
+        self.speculate_partial_fields = os.getenv("SPECULATIVE_PARTIAL_FIELDS", "false").lower() in ("1", "true", "yes")
+        # Server-driven turns: end-of-turn transcripts are processed without stop_audio_stream
+        self.auto_turn = False
+        self.turn_debounce = 0.0
+        self.user_id = None
+        self._turn_texts = {}  # turn_order -> final text, merged when finals land inside the debounce
+        # (turn_orders, text) of the last turn processed server-side, so an echo of it is ignored
+        self._last_auto_turn = None
+        self._turn_timer = None
+        self._turn_lock = threading.Lock()
+        self._process_lock = threading.Lock()
+        self.auto_turns = 0
+        self.merged_turns = 0
+        # Correlation id of the turn being spoken; minted on its first audio frame
+        self.turn_id = None
+        self.last_audio_at = None
+
+    def start_stream(self, binary_audio=False, stream_responses=False, vad=None, audio_format=None,
+                     auto_turn=None, turn_debounce_ms=None, user_id=None, speculative_intent=None):
+        """Attach a pooled upstream session; binary_audio selects raw PCM frames instead of legacy base64 text.
+
+        Returns at once: audio sent before the upstream handshake finishes is held in a
+        ring buffer of STT_HANDSHAKE_BUFFER_MS and flushed when the session is ready.
+
+        vad is the client's VAD option (bool or settings dict); VAD_* env vars give the defaults.
+        audio_format ({sample_rate, channels, encoding}) declares what the client sends; raises
+        ValueError if it is unsupported. Upstream always receives 16 kHz mono pcm_s16le.
+
+        auto_turn (opt-in per client) processes each end-of-turn transcript for
+        user_id as soon as it arrives; finals within turn_debounce_ms (AUTO_TURN_DEBOUNCE_MS)
+        of each other are merged into one request. speculative_intent (default SPECULATIVE_INTENT)
+        classifies stable partial transcripts before the turn ends.
+        """
+        # Token streaming is negotiated per session so existing clients keep the single ai_response event
+        self.stream_responses = stream_responses and self.on_ai_response_delta is not None
+        # Only clients that ask for it: legacy clients still echo the transcript back themselves
+        auto_turn = _flag(auto_turn)
+        if auto_turn and user_id is None:
+            print("Auto turn processing needs a user id; waiting for stop_audio_stream instead")
+            auto_turn = False
+        self.auto_turn = auto_turn
+        self.user_id = user_id
+        if turn_debounce_ms is None:
+            turn_debounce_ms = os.getenv("AUTO_TURN_DEBOUNCE_MS", "100")
+        self.turn_debounce = max(float(turn_debounce_ms), 0.0) / 1000
+        if speculative_intent is not None:
+            self.partial_speculator.enabled = _flag(speculative_intent)
         if self.is_streaming:
             print("Stream already running")
             return
 
-        print("Starting audio stream...")
+        # Validate every client option before touching session state
+        client_format = parse_audio_format(audio_format)
+        settings = vad_settings(vad)
+        transcoder = StreamingTranscoder(**client_format)
+        self.transcoder = None if transcoder.passthrough else transcoder
+        self.client_frame_bytes = transcoder.bytes_per_frame
+        self.max_client_frame_bytes = (MAX_CLIENT_FRAME_SECONDS * client_format["sample_rate"]
+                                       * transcoder.bytes_per_frame)
+
+        self.vad = VoiceActivityDetector.from_settings(settings) if settings["enabled"] else None
+        print(f"Starting audio stream ({'binary' if binary_audio else 'base64'} frames, "
+              f"{client_format['sample_rate']} Hz x{client_format['channels']} {client_format['encoding']}, "
+              f"VAD {'on' if self.vad else 'off'})...")
         self.is_streaming = True
-        self._stop_event = threading.Event()
-
-        # Create and start the thread
-        self.thread = threading.Thread(target=self._run_ws_loop, daemon=False)
-        self.thread.start()
-
-        # Wait a bit for connection to establish
-        time.sleep(10)
-
-        if not self.is_connected:
-            print("Failed to establish connection within timeout")
-
-    def _run_ws_loop(self):
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
-
-        try:
-            # Run the connection coroutine
-            self.loop.run_until_complete(self._connect_and_run())
-        except Exception as e:
-            print(f"WebSocket loop error: {e}")
-        finally:
-            print("WebSocket loop ended")
-            self.is_streaming = False
+        self.binary_audio = binary_audio
+        with self._pending_lock:
+            self._pending.clear()
+            self._pending_bytes = 0
+            self.upstream_ready = False
+        self.stream_started_at = time.perf_counter()
+
+        # Handed out without waiting for the handshake; early frames wait in the ring buffer
+        pool = get_stt_pool()
+        pool.start()  # no-op once running; the queue needs the pool's loop
+        self.send_queue = AudioSendQueue(pool.loop, on_backpressure=self.on_backpressure)
+        self.upstream = pool.acquire(self)
+
+    def on_upstream_ready(self, session):
+        """Pool loop: Begin received. Flush the handshake buffer and start forwarding audio"""
+        if session is not self.upstream or not self.send_queue:
+            return
+        with self._pending_lock:
+            while self._pending:
+                self.send_queue.put(self._pending.popleft())
+            self._pending_bytes = 0
+            first = not self.upstream_ready
+            self.upstream_ready = True
+        self.is_connected = True
+        self._drain_task = asyncio.ensure_future(self._drain_audio(session.websocket))
+        if first:
+            waited = time.perf_counter() - self.stream_started_at
+            metrics.observe("stream_ready", waited)
+            print(f"✅ Upstream STT session #{session.id} ready ({waited * 1000:.0f} ms after stream start)")
+
+    def on_upstream_lost(self, session):
+        """Pool loop: the connection dropped and is being retried; audio keeps queueing meanwhile"""
+        if session is self.upstream:
             self.is_connected = False
+            self._stop_drain()
 
-    async def _connect_and_run(self):
-        max_retries = 3
-        retry_count = 0
-
-        while retry_count < max_retries and not self._stop_event.is_set(): # type: ignore
-            try:
-                # Updated to new Universal Streaming endpoint
-                url = "wss://streaming.assemblyai.com/v3/ws?sample_rate=16000&word_boost=[]&encoding=pcm_s16le"
-                headers = {"Authorization": self.api_key}
-
-                print(f"Attempting to connect to AssemblyAI Universal Streaming... (attempt {retry_count + 1})")
-                print(f"URL: {url}")
-
-                async with websockets.connect(
-                        url,
-                        additional_headers=headers, # type: ignore
-                        ping_interval=20,  # Send ping every 20 seconds
-                        ping_timeout=10,  # Wait 10 seconds for pong
-                        close_timeout=10  # Wait 10 seconds for close
-                ) as websocket:
-                    self.ws = websocket
-                    self.is_connected = True
-                    print("Successfully connected to AssemblyAI Universal Streaming WebSocket")
-
-                    # For the new API, we don't need to send initial configuration
-                    # The configuration is passed in the URL parameters
-                    print("Using Universal Streaming API - no initial config needed")
-
-                    # Start receiving messages
-                    await self._receive_messages(websocket)
-
-            except websockets.exceptions.InvalidStatusCode as e: # type: ignore
-                print(f"Invalid status code: {e}")
-                if e.status_code == 401:
-                    print("Authentication failed - check your API key")
-                    break
-            except websockets.exceptions.ConnectionClosedError as e:
-                print(f"Connection closed: {e}")
-            except Exception as e:
-                print(f"Connection error: {e}")
-
-            retry_count += 1
-            if retry_count < max_retries and not self._stop_event.is_set(): # type: ignore
-                wait_time = 2 ** retry_count  # Exponential backoff
-                print(f"Retrying in {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-
+    def on_upstream_closed(self, session):
+        """Pool loop: the upstream session is gone for good"""
+        if session is not self.upstream:
+            return
+        print("Upstream STT session ended")
+        self._stop_drain()
+        if self.send_queue:
+            self.send_queue.close()
+        self.upstream = None
         self.is_connected = False
-        print("Connection attempts exhausted or stopped")
+        self.is_streaming = False
 
-    async def _receive_messages(self, websocket):
-        try:
-            while not self._stop_event.is_set(): # type: ignore
-                # Wait for message with timeout
-                try:
-                    message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
-                    await self._handle_message(message)
-                except asyncio.TimeoutError:
-                    # Check if we should continue listening
-                    continue
-                except websockets.exceptions.ConnectionClosed:
-                    print("WebSocket connection closed by server")
-                    break
+    async def on_upstream_message(self, message):
+        await self._handle_message(message)
 
-        except Exception as e:
-            print(f"Error in receive loop: {e}")
+    def _stop_drain(self):
+        if self._drain_task and not self._drain_task.done():
+            self._drain_task.cancel()
+        self._drain_task = None
 
     async def _handle_message(self, message):
         try:
@@ -139,6 +205,18 @@ class SpeechProcessor:
 
             elif message_type == "Turn":
                 text = msg.get('transcript', '')
+                if self.last_audio_at is not None:
+                    # Time from the latest audio frame we sent to this transcript arriving
+                    metrics.observe("stt_turn", time.perf_counter() - self.last_audio_at,
+                                    "final" if msg.get("end_of_turn") else "partial", turn_id=self.turn_id)
+                if msg.get("end_of_turn") and self.vad:
+                    # The trailing silence did its job; stop forwarding it
+                    self.vad.end_of_turn()
+                if msg.get("end_of_turn"):
+                    self.partial_speculator.end_turn()
+                elif text.strip():
+                    # Hands stable partials to a worker; never blocks the receive loop
+                    self.partial_speculator.observe_partial(text)
                 confidence = msg['words'][-1].get("confidence", 0)
                 if text.strip():
                     print(f"✅ Final transcript: '{text}' (confidence: {confidence:.2f})")
@@ -146,7 +224,8 @@ class SpeechProcessor:
                     if text:
 
                         self.on_transcription_result(text)
-                        # self.process_request(text)
+                        if msg.get("end_of_turn") and self.auto_turn:
+                            self._schedule_turn(msg.get("turn_order"), text)
 
 
             elif message_type == "SessionTerminated":
@@ -164,89 +243,273 @@ class SpeechProcessor:
         except Exception as e:
             print(f"Error handling message: {e}")
 
-    def send_audio(self, base64_audio):
-        if not self.is_connected or not self.ws:
-            print("❌ WebSocket not connected, cannot send audio")
+    def _schedule_turn(self, turn_order, text):
+        """Pool loop: (re)start the debounce; processing runs on the timer thread, never the loop"""
+        with self._turn_lock:
+            key = turn_order if turn_order is not None else len(self._turn_texts)
+            if self._turn_texts and key not in self._turn_texts:
+                self.merged_turns += 1
+            # A re-sent final for the same turn (e.g. the formatted copy) replaces the first
+            self._turn_texts[key] = text
+            if self._turn_timer:
+                self._turn_timer.cancel()
+            self._turn_timer = threading.Timer(self.turn_debounce, self.flush_turn)
+            self._turn_timer.daemon = True
+            self._turn_timer.start()
+
+    def take_pending_turn(self):
+        """Remove and return the debounced transcript (or None) without processing it"""
+        return self._take_pending_turn()[1]
+
+    def _take_pending_turn(self, claim=False):
+        """claim marks the turn as processed server-side in the same critical section"""
+        with self._turn_lock:
+            if self._turn_timer:
+                self._turn_timer.cancel()
+                self._turn_timer = None
+            keys = sorted(self._turn_texts)
+            text = " ".join(t.strip() for t in (self._turn_texts[key] for key in keys) if t.strip())
+            self._turn_texts.clear()
+            if claim and text:
+                self._last_auto_turn = (keys, text)
+        return keys, text or None
+
+    def flush_turn(self):
+        """Process the pending end-of-turn transcript now; returns False if there was none"""
+        _, text = self._take_pending_turn(claim=True)
+        if not text:
+            return False
+        self.auto_turns += 1
+        print(f"🗣️ End of turn, processing: '{text}'")
+        # One turn at a time per session, in the order they were spoken
+        with self._process_lock:
+            self.process_request(text, self.user_id)
+        return True
+
+    def process_client_turn(self, text, id):
+        """stop_audio_stream path; returns False if the turn was already processed server-side"""
+        # Text sent by the client wins over a server-side turn still in its debounce window
+        self.take_pending_turn()
+        with self._turn_lock:
+            echoed = self._last_auto_turn is not None and self._last_auto_turn[1] == (text or "").strip()
+            if echoed:
+                self._last_auto_turn = None
+        if echoed:
+            print("Ignoring stop_audio_stream for a turn already processed server-side")
             return False
+        with self._process_lock:
+            self.process_request(text, id)
+        return True
 
-        if not base64_audio or not base64_audio.strip():
+    def send_audio(self, audio):
+        if not self.is_streaming or not self.send_queue:
+            print("❌ Audio stream not started, cannot send audio")
+            return False
+
+        if self.turn_id is None:
+            self.turn_id = metrics.start_turn()
+        with metrics.span("audio_ingest", "binary" if self.binary_audio else "base64", turn_id=self.turn_id):
+            sent = self._send_binary_audio(audio) if self.binary_audio else self._send_base64_audio(audio)
+        self.last_audio_at = time.perf_counter()
+        return sent
+
+    def _send_binary_audio(self, pcm_bytes):
+        """Accept a raw PCM frame in the session's declared format and queue it for upstream"""
+        if not isinstance(pcm_bytes, (bytes, bytearray, memoryview)):
+            print(f"Expected binary audio frame, got {type(pcm_bytes).__name__}")
+            return False
+
+        frame = memoryview(pcm_bytes).cast("B")
+        frame_len = frame.nbytes
+        if frame_len == 0:
             print("Empty audio data received")
             return False
+        if frame_len % self.client_frame_bytes:
+            print(f"Misaligned audio frame: {frame_len} bytes is not a multiple of {self.client_frame_bytes}")
+            return False
+        if frame_len > self.max_client_frame_bytes:
+            print(f"Audio frame too large: {frame_len} bytes")
+            return False
 
-        try:
-            # Validate base64 format
-            try:
-                decoded = base64.b64decode(base64_audio)
-            except Exception as e:
-                print(f"Invalid base64 audio data: {e}")
-                return False
-
-            # For Universal Streaming API, send the base64 string directly
-            # No need to wrap in JSON - just send the base64 string
-            if self.loop and not self.loop.is_closed():
-                future = asyncio.run_coroutine_threadsafe(
-                    self.ws.send(base64_audio),  # Send base64 directly, not wrapped in JSON
-                    self.loop
-                )
-
-                # Wait for completion with timeout
-                future.result(timeout=2.0)
+        return self._enqueue(frame)
 
+    def _enqueue(self, pcm):
+        """Transcode, drop silence (when VAD is on) and queue the rest; returns immediately"""
+        if self.transcoder:
+            pcm = self.transcoder.process(pcm)
+            if not pcm:
+                return True
+        if self.vad:
+            pcm = self.vad.process(pcm)
+            if not pcm:
                 return True
+        with self._pending_lock:
+            if not self.upstream_ready:
+                self._buffer_pending(pcm)
+                return True
+            # The sender coroutine coalesces and forwards it
+            return self.send_queue.put(pcm) # type: ignore
+
+    def _buffer_pending(self, pcm):
+        """Keep the newest max_pending_bytes of pre-handshake audio; called with _pending_lock held"""
+        if len(pcm) > self.max_pending_bytes:
+            cut = len(pcm) - self.max_pending_bytes
+            pcm = pcm[cut:]
+            self.pending_dropped_bytes += cut
+        self._pending.append(bytes(pcm))
+        self._pending_bytes += len(pcm)
+        while self._pending_bytes > self.max_pending_bytes:
+            dropped = len(self._pending.popleft())
+            self._pending_bytes -= dropped
+            self.pending_dropped_bytes += dropped
+
+    async def _drain_audio(self, websocket):
+        """Forward coalesced queue chunks upstream in the session's negotiated frame format"""
+        async def send(chunk):
+            if self.binary_audio:
+                await websocket.send(chunk)
             else:
-                print("Event loop is not running")
-                return False
+                await websocket.send(base64.b64encode(chunk).decode("ascii"))
 
-        except asyncio.TimeoutError:
-            print("⏰ Timeout sending audio data")
-            return False
+        try:
+            await self.send_queue.drain(send) # type: ignore
+        except websockets.exceptions.ConnectionClosed:
+            print("Upstream closed while sending audio")
         except Exception as e:
             print(f"❌ Error sending audio: {e}")
+
+    def _send_base64_audio(self, base64_audio):
+        """Legacy mode: validate a base64 text frame and forward it as-is"""
+        if not base64_audio or not base64_audio.strip():
+            print("Empty audio data received")
+            return False
+
+        # Validate base64 format
+        try:
+            pcm = base64.b64decode(base64_audio)
+        except Exception as e:
+            print(f"Invalid base64 audio data: {e}")
+            return False
+        if len(pcm) % self.client_frame_bytes:
+            print(f"Misaligned audio frame: {len(pcm)} bytes is not a multiple of {self.client_frame_bytes}")
             return False
 
+        # Queued as PCM so it coalesces with its neighbours; re-encoded to base64 when sent
+        return self._enqueue(pcm)
+
     def close_stream(self):
         print("🔴 Closing audio stream...")
 
-        if self._stop_event:
-            self._stop_event.set()
-
-        if self.ws and self.is_connected:
-            try:
-                # For Universal Streaming API, just close the connection
-                # No need to send termination message
-                if self.loop and not self.loop.is_closed():
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.ws.close(),
-                        self.loop
-                    )
-                    future.result(timeout=2.0)
-                    print("Connection closed")
-
-            except Exception as e:
-                print(f"Error during cleanup: {e}")
-
-        # Wait for thread to finish
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=5)
-            if self.thread.is_alive():
-                print("Thread did not terminate gracefully")
+        if self.send_queue:
+            self.send_queue.close()
+        # Nobody is left to receive the answer to a turn still in its debounce window
+        self.take_pending_turn()
+        upstream, self.upstream = self.upstream, None
+        if upstream:
+            # Cancels the drain and closes the websocket on the pool loop; nothing to join
+            get_stt_pool().release(upstream)
+            upstream.pool.loop.call_soon_threadsafe(self._stop_drain)
+        with self._pending_lock:
+            self._pending.clear()
+            self._pending_bytes = 0
+            self.upstream_ready = False
 
         self.is_connected = False
         self.is_streaming = False
         print("✅ Stream closed successfully")
 
     def get_status(self):
+        upstream = self.upstream
         return {
             "is_connected": self.is_connected,
             "is_streaming": self.is_streaming,
             "has_api_key": bool(self.api_key),
-            "thread_alive": self.thread.is_alive() if self.thread else False
+            "upstream": {
+                "id": upstream.id,
+                "ready": upstream.ready.is_set(),
+                "session_id": upstream.session_id,
+            } if upstream else None,
+            "handshake_buffer": {
+                "buffered_bytes": self._pending_bytes,
+                "dropped_bytes": self.pending_dropped_bytes,
+            },
+            "audio_queue": self.send_queue.get_stats() if self.send_queue else None,
+            "vad": self.vad.get_stats() if self.vad else None,
+            "partial_intent": self.partial_speculator.get_stats(),
+            "auto_turn": {
+                "enabled": self.auto_turn,
+                "debounce_ms": self.turn_debounce * 1000,
+                "processed": self.auto_turns,
+                "merged": self.merged_turns,
+            },
         }
 
     def process_request(self, text, id):
-        ai_generator = AIGenerator()
-        full_prompt = f"{prompt_dict.get('INTENT_PROMPT')} {text}"
+        # Close out the spoken turn; the next audio frame starts a new one
+        turn_id = self.turn_id or metrics.start_turn()
+        self.turn_id = None
+        token = metrics.bind_turn(turn_id)
+        outcome = "error"
+        try:
+            with metrics.span("intent"):
+                # Reuse what was worked out from the partials when the final says the same thing
+                speculated = self.partial_speculator.take(text)
+                if speculated:
+                    # Partials are never counted, so count the real turn once, by its final text
+                    _, confidence = self.intent_classifier.classify(text)
+                    self.intent_classifier.record(used_local=self.intent_classifier.is_confident(confidence))
+                get_intent, fields = speculated or self.classify_intent(text)
+            on_delta = self.on_ai_response_delta if self.stream_responses else None
+            intent_label = (get_intent or "").strip()
+            # LLM replies are free text; keep the label set bounded
+            with metrics.span("action", intent_label if intent_label in INTENTS else "other"):
+                response = self.action.take_action(get_intent, text, id, on_delta=on_delta, fields=fields)
+            self.on_ai_response_result(response)
+            outcome = "error" if str(response).startswith("Error") else "ok"
+        finally:
+            metrics.finish_turn(turn_id, outcome)
+            metrics.unbind_turn(token)
 
-        get_intent = ai_generator.generate_response(full_prompt)
-        response = self.action.take_action(get_intent, text, id)
-        self.on_ai_response_result(response)
\ No newline at end of file
+    def _classify_partial(self, text):
+        """Speculation worker: classify a partial transcript, optionally extracting its fields too"""
+        token = metrics.bind_turn(self.turn_id) if self.turn_id else None
+        try:
+            intent, fields = self.classify_intent(text, speculate=False)
+            intent_key = (intent or "").strip().upper()
+            if fields is None and self.speculate_partial_fields and intent_key in EXTRACTION_PROMPTS:
+                fields = self.action.extract_fields(intent_key, text)
+            return intent, fields
+        finally:
+            if token:
+                metrics.unbind_turn(token)
+
+    def classify_intent(self, text, speculate=True):
+        """Return (intent, fields); fields is None unless a fused call already extracted them.
+
+        Local fast path first; only low-confidence transcripts go to the LLM. speculate=False
+        (partial transcripts) only decides the intent: no fused or speculative extraction, and
+        the classifier's turn counters are left alone.
+        """
+        probabilities = self.intent_classifier.scores(text)
+        intent = max(probabilities, key=probabilities.get) # type: ignore
+        confidence = probabilities[intent]
+        if self.intent_classifier.is_confident(confidence):
+            if speculate:
+                self.intent_classifier.record(used_local=True)
+                print(f"⚡ Local intent: {intent} (confidence: {confidence:.2f})")
+            return intent, None
+
+        if not speculate:
+            return self.ai_generator.generate_for_template("INTENT_PROMPT", text), None
+
+        self.intent_classifier.record(used_local=False)
+        if self.fused_intent:
+            intent, fields = self.action.classify_and_extract(text)
+            if intent:
+                return intent, fields
+            print("Fused intent call failed, falling back to INTENT_PROMPT")
+
+        # Extraction for the likeliest intents runs alongside the intent call when enabled
+        branches = self.speculator.start(text, probabilities)
+        intent = self.ai_generator.generate_for_template("INTENT_PROMPT", text)
+        return intent, self.speculator.resolve(branches, intent)
@@ -0,0 +1,325 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import websockets
+
+import metrics
+
+DEFAULT_WS_URL = "wss://streaming.assemblyai.com/v3/ws"
+# The configuration is passed in the URL; every session is opened for the same 16 kHz PCM stream
+STREAM_PARAMS = "sample_rate=16000&word_boost=[]&encoding=pcm_s16le"
+# After an idle session fails to connect, wait this long before dialing replacements
+REFILL_BACKOFF_SECONDS = 30
+
+
+class UpstreamSession:
+    """One AssemblyAI streaming websocket, connected while parked in the pool.
+
+    `ready` is set when the service sends Begin. Until a SpeechProcessor is bound as the
+    handler, incoming messages are dropped; afterwards the handler gets on_upstream_ready,
+    every message, on_upstream_lost for a dropped connection that will be retried, and
+    on_upstream_closed once the session is finished for good.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.id = next(pool._ids)
+        self.websocket = None
+        self.handler = None
+        self.ready = threading.Event()
+        self.closed = False
+        self.created_at = time.monotonic()
+        self.session_id = None
+        self.task = None
+
+    def bind(self, handler):
+        """Runs on the pool loop; a session that is already ready notifies straight away"""
+        if self.closed:
+            handler.on_upstream_closed(self)
+            return
+        self.handler = handler
+        if self.ready.is_set():
+            handler.on_upstream_ready(self)
+
+    def close(self):
+        """Safe from any thread; cancelling the task closes the websocket"""
+        self.closed = True
+        self.handler = None
+        self.pool.loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    async def run(self):
+        connected = False
+        for attempt in range(1, self.pool.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                print(f"Connecting upstream STT session #{self.id}... (attempt {attempt})")
+                async with websockets.connect(
+                        self.pool.url,
+                        additional_headers={"Authorization": self.pool.api_key}, # type: ignore
+                        ping_interval=20,  # Send ping every 20 seconds
+                        ping_timeout=10,  # Wait 10 seconds for pong
+                        close_timeout=10  # Wait 10 seconds for close
+                ) as websocket:
+                    self.websocket = websocket
+                    async for message in websocket:
+                        if await self._dispatch(message, started):
+                            connected = True
+                    print(f"Upstream STT session #{self.id} closed by server")
+
+            except asyncio.CancelledError:
+                break
+            except websockets.exceptions.InvalidStatus as e:
+                print(f"Upstream STT session #{self.id} rejected: {e}")
+                if e.response.status_code == 401:
+                    print("Authentication failed - check your API key")
+                    break
+            except websockets.exceptions.ConnectionClosedError as e:
+                print(f"Connection closed: {e}")
+            except Exception as e:
+                print(f"Connection error: {e}")
+            finally:
+                self.websocket = None
+                self.ready.clear()
+
+            # Parked sessions are simply replaced by the pool; bound ones reconnect like before
+            if self.closed or self.handler is None:
+                break
+            self.handler.on_upstream_lost(self)
+            if attempt < self.pool.max_retries:
+                wait_time = 2 ** attempt  # Exponential backoff
+                print(f"Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+
+        self.closed = True
+        handler, self.handler = self.handler, None
+        self.pool._finished(self, failed=not connected)
+        if handler:
+            handler.on_upstream_closed(self)
+
+    async def _dispatch(self, message, started):
+        """Returns True when this message completed the handshake"""
+        began = False
+        if not self.ready.is_set():
+            try:
+                msg = json.loads(message)
+            except ValueError:
+                msg = None
+            if isinstance(msg, dict) and msg.get("type") == "Begin":
+                self.session_id = msg.get("id")
+                self.ready.set()
+                self.pool._handshake_done(time.perf_counter() - started)
+                if self.handler:
+                    self.handler.on_upstream_ready(self)
+                began = True
+        if self.handler:
+            await self.handler.on_upstream_message(message)
+        return began
+
+
+class STTConnectionPool:
+    """Pre-connected upstream STT sessions, handed out without waiting for a handshake.
+
+    Every session lives on one shared asyncio loop thread. acquire() returns a parked session
+    (preferring one that already got Begin) or dials a new one, and never blocks; the pool is
+    topped back up to STT_POOL_SIZE in the background. Sessions parked longer than
+    STT_POOL_IDLE_SECONDS are recycled, since an unused upstream session is closed by the
+    service eventually. Used sessions are closed on release rather than reused: a
+    streaming session carries its turn state.
+
+    Parked sessions are billed upstream sessions, so the pool stays empty until the first
+    acquire() and empties again once no stream has started for STT_POOL_WARM_SECONDS.
+    """
+
+    def __init__(self, size=None, idle_timeout=None, warm_seconds=None, max_retries=3):
+        # Cost tradeoff: while warm, every parked session is an open AssemblyAI session and is
+        # redialed every STT_POOL_IDLE_SECONDS, i.e. about STT_POOL_SIZE * 86400 / IDLE_SECONDS
+        # sessions a day of continuous traffic (5,760 with the defaults). STT_POOL_SIZE=0 turns
+        # the pool off (every stream waits for its own handshake); STT_POOL_WARM_SECONDS bounds
+        # how long the pool stays filled after the last stream started.
+        self.size = int(size if size is not None else os.getenv("STT_POOL_SIZE", "2"))
+        self.idle_timeout = float(idle_timeout or os.getenv("STT_POOL_IDLE_SECONDS", "30"))
+        self.warm_seconds = float(warm_seconds or os.getenv("STT_POOL_WARM_SECONDS", "300"))
+        self.max_retries = max_retries
+        # ASSEMBLYAI_WS_URL lets load tests use benchmarks/fake_assemblyai.py
+        self.url = f"{os.getenv('ASSEMBLYAI_WS_URL', DEFAULT_WS_URL)}?{STREAM_PARAMS}"
+        self.api_key = os.getenv("ASSEMBLYAI_API_TOKEN")
+
+        self.loop = None
+        self._thread = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._in_use = set()
+        self._ids = itertools.count(1)
+        self._refill_after = 0.0
+        self._last_acquire = None  # time.monotonic() of the latest acquire(); None = never used
+
+        self.created = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+        self.recycled = 0
+        self.failed = 0
+        self.handshakes = 0
+        self.handshake_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="stt-pool", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._maintain())
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        except Exception as e:
+            print(f"STT pool loop error: {e}")
+        finally:
+            print("STT pool loop ended")
+
+    def acquire(self, handler):
+        """Hand out a session bound to handler right away; readiness is signalled on the handler"""
+        self.start()
+        with self._lock:
+            self._last_acquire = time.monotonic()
+            session = self._take_idle()
+            if session:
+                self.warm_hits += 1
+            else:
+                self.cold_starts += 1
+                session = self._new_session()
+            self._in_use.add(session)
+        self.loop.call_soon_threadsafe(session.bind, handler) # type: ignore
+        self.loop.call_soon_threadsafe(self._refill) # type: ignore
+        return session
+
+    def release(self, session):
+        with self._lock:
+            self._in_use.discard(session)
+        session.close()
+
+    def _take_idle(self):
+        live = [s for s in self._idle if not s.closed]
+        if not live:
+            self._idle.clear()
+            return None
+        session = next((s for s in live if s.ready.is_set()), live[0])
+        self._idle = deque(s for s in live if s is not session)
+        return session
+
+    def _new_session(self):
+        session = UpstreamSession(self)
+        self.created += 1
+        self.loop.call_soon_threadsafe(self._launch, session) # type: ignore
+        return session
+
+    def _launch(self, session):
+        if not session.closed:
+            session.task = self.loop.create_task(session.run()) # type: ignore
+
+    def _warm(self, now):
+        return self._last_acquire is not None and now - self._last_acquire <= self.warm_seconds
+
+    def _refill(self):
+        """Runs on the pool loop; dials replacements until size sessions are parked"""
+        now = time.monotonic()
+        if now < self._refill_after or not self._warm(now):
+            return
+        with self._lock:
+            self._idle = deque(s for s in self._idle if not s.closed)
+            for _ in range(self.size - len(self._idle)):
+                self._idle.append(self._new_session())
+
+    async def _maintain(self):
+        self._refill()
+        interval = max(min(self.idle_timeout / 2, 5.0), 0.5)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            warm = self._warm(now)
+            with self._lock:
+                # Once nobody has streamed for warm_seconds every parked session is closed
+                expired = [s for s in self._idle if not warm or now - s.created_at > self.idle_timeout]
+                self._idle = deque(s for s in self._idle if s not in expired)
+            # Dial the replacements first so a ready session is parked most of the time
+            self._refill()
+            for session in expired:
+                session.close()
+            self.recycled += len(expired)
+
+    def _finished(self, session, failed):
+        with self._lock:
+            self._in_use.discard(session)
+            parked = session in self._idle
+            if parked:
+                self._idle.remove(session)
+            if failed:
+                self.failed += 1
+                if parked:
+                    # Don't hammer a service that is down or rejecting the key
+                    self._refill_after = time.monotonic() + REFILL_BACKOFF_SECONDS
+
+    def _handshake_done(self, seconds):
+        self.handshakes += 1
+        self.handshake_seconds += seconds
+        metrics.observe("stt_connect", seconds)
+
+    def stop(self):
+        with self._lock:
+            sessions = list(self._idle) + list(self._in_use)
+            self._idle.clear()
+            self._in_use.clear()
+        for session in sessions:
+            session.close()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def get_stats(self):
+        with self._lock:
+            idle = list(self._idle)
+            in_use = len(self._in_use)
+        return {
+            "size": self.size,
+            "warm": self._warm(time.monotonic()),
+            "idle": len(idle),
+            "idle_ready": sum(1 for s in idle if s.ready.is_set()),
+            "in_use": in_use,
+            "created": self.created,
+            "warm_hits": self.warm_hits,
+            "cold_starts": self.cold_starts,
+            "recycled": self.recycled,
+            "failed": self.failed,
+            "avg_handshake_ms": self.handshake_seconds / self.handshakes * 1000 if self.handshakes else 0.0,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_stt_pool():
+    """Process-wide STTConnectionPool, built on first use so .env settings are loaded.
+
+    Nothing is dialed until the first acquire().
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = STTConnectionPool()
+    return _pool
@@ -0,0 +1,199 @@
+import math
+import os
+import threading
+from collections import Counter, deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+WINDOW_MS = 20
+WINDOW_SAMPLES = SAMPLE_RATE * WINDOW_MS // 1000
+WINDOW_BYTES = WINDOW_SAMPLES * BYTES_PER_SAMPLE
+
+# Accepted (min, max) for client-supplied settings; padding_ms bounds the pre-roll buffer
+SETTING_RANGES = {
+    "threshold_db": (-100.0, 0.0),
+    "max_zcr": (0.0, 1.0),
+    "hangover_ms": (0, 2000),
+    "padding_ms": (0, 2000),
+    "max_trailing_ms": (WINDOW_MS, 30000),
+    "keepalive_ms": (WINDOW_MS, 60000),
+}
+
+# Summed over every session for /metrics
+_totals = Counter()
+_totals_lock = threading.Lock()
+
+
+def get_totals():
+    with _totals_lock:
+        totals = dict(_totals)
+    total = totals.get("input_bytes", 0)
+    totals["suppressed_fraction"] = 1 - totals.get("forwarded_bytes", 0) / total if total else 0.0
+    return totals
+
+
+def vad_settings(options=None):
+    """Per-session settings: env defaults (VAD_*) overridden by the client's start_audio_stream options.
+
+    options may be a bool (just on/off) or a dict with enabled / threshold_db / hangover_ms / ...
+    Raises ValueError for values that don't convert or fall outside SETTING_RANGES.
+    """
+    settings = {
+        "enabled": os.getenv("VAD_ENABLED", "false").lower() in ("1", "true", "yes"),
+        "threshold_db": float(os.getenv("VAD_THRESHOLD_DB", "-45")),
+        "max_zcr": float(os.getenv("VAD_MAX_ZCR", "0.35")),
+        "hangover_ms": int(os.getenv("VAD_HANGOVER_MS", "300")),
+        "padding_ms": int(os.getenv("VAD_PADDING_MS", "200")),
+        "max_trailing_ms": int(os.getenv("VAD_MAX_TRAILING_MS", "3000")),
+        "keepalive_ms": int(os.getenv("VAD_KEEPALIVE_MS", "5000")),
+    }
+    if isinstance(options, (bool, str, int)):
+        settings["enabled"] = _parse_setting("enabled", options, bool)
+    elif isinstance(options, dict):
+        for key, value in options.items():
+            if key in settings and value is not None:
+                settings[key] = _parse_setting(key, value, type(settings[key]))
+    return settings
+
+
+def _parse_setting(key, value, kind):
+    """Convert one client value; raises ValueError (reported to the client) if it doesn't fit"""
+    if kind is bool:
+        return str(value).lower() in ("1", "true", "yes")
+    try:
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Invalid VAD setting {key}: {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid VAD setting {key}: {value!r}")
+    low, high = SETTING_RANGES[key]
+    if not low <= number <= high:
+        raise ValueError(f"VAD setting {key} must be between {low} and {high}, got {value!r}")
+    return number
+
+
+class VoiceActivityDetector:
+    """Energy + zero-crossing VAD over 20 ms pcm_s16le windows with hangover smoothing.
+
+    Speech is forwarded with padding_ms of pre-roll and hangover_ms after it. After that the
+    stream stays open (silence included) until the STT service reports end of turn, since its
+    endpointing needs the trailing silence, or until max_trailing_ms. While idle only one
+    window every keepalive_ms is forwarded so the upstream session is not starved.
+    """
+
+    def __init__(self, threshold_db=-45.0, max_zcr=0.35, hangover_ms=300, padding_ms=200,
+                 max_trailing_ms=3000, keepalive_ms=5000, enabled=True):
+        self.enabled = enabled
+        self.threshold_db = threshold_db
+        self.max_zcr = max_zcr
+        self.hangover_windows = max(hangover_ms // WINDOW_MS, 0)
+        self.max_trailing_windows = max(max_trailing_ms // WINDOW_MS, 1)
+        self.keepalive_windows = max(keepalive_ms // WINDOW_MS, 1)
+
+        self._remainder = b""
+        self._pre_roll = deque(maxlen=max(padding_ms // WINDOW_MS, 0))
+        self._window_index = 0
+        self._last_speech = -(10 ** 9)
+        self._in_turn = False
+        self._trailing = 0
+        self._since_forward = 0
+        self._turn_ended = False
+
+        self.input_bytes = 0
+        self.forwarded_bytes = 0
+        self.keepalive_bytes = 0
+        self.segments = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(**settings)
+
+    def classify(self, samples):
+        """Vectorized per-window speech flags for an int16 array of whole windows"""
+        windows = samples.reshape(-1, WINDOW_SAMPLES)
+        as_float = windows.astype(np.float32)
+        rms = np.sqrt(np.einsum("ij,ij->i", as_float, as_float) / WINDOW_SAMPLES)
+        energy_db = 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+        signs = np.signbit(windows)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (WINDOW_SAMPLES - 1)
+        # Loud but hiss-like windows (very high crossing rate) are treated as noise
+        return (energy_db > self.threshold_db) & (zcr < self.max_zcr)
+
+    def _active(self, speech):
+        # Hangover without a Python loop: distance from each window to the latest speech window
+        index = np.arange(self._window_index, self._window_index + len(speech))
+        last_speech = np.maximum.accumulate(np.where(speech, index, self._last_speech))
+        self._last_speech = int(last_speech[-1])
+        self._window_index += len(speech)
+        return (index - last_speech) <= self.hangover_windows
+
+    def end_of_turn(self):
+        """Called when the STT service finalizes a turn; lets the stream go idle again"""
+        self._turn_ended = True
+
+    def process(self, pcm):
+        """Return the bytes of this frame that should go upstream (possibly empty)"""
+        if not self.enabled:
+            return pcm
+        data = self._remainder + bytes(pcm)
+        whole = len(data) - len(data) % WINDOW_BYTES
+        self._remainder = data[whole:]
+        if not whole:
+            return b""
+
+        speech = self.classify(np.frombuffer(data, dtype="<i2", count=whole // BYTES_PER_SAMPLE))
+        active = self._active(speech)
+
+        out = bytearray()
+        keepalive = 0
+        for i, (is_speech, is_active) in enumerate(zip(speech.tolist(), active.tolist())):
+            window = data[i * WINDOW_BYTES:(i + 1) * WINDOW_BYTES]
+            if is_speech:
+                # Talking again after the STT closed the previous turn: this is a new one
+                self._turn_ended = False
+            if is_active:
+                if not self._in_turn:
+                    self._in_turn = True
+                    self._turn_ended = False
+                    self.segments += 1
+                    out += b"".join(self._pre_roll)
+                    self._pre_roll.clear()
+                self._trailing = 0
+                out += window
+            elif self._in_turn:
+                # Trailing silence: upstream endpointing needs it to close the turn
+                out += window
+                self._trailing += 1
+                if self._turn_ended or self._trailing >= self.max_trailing_windows:
+                    self._in_turn = False
+                    self._since_forward = 0
+                    continue
+            else:
+                self._since_forward += 1
+                if self._since_forward >= self.keepalive_windows:
+                    out += window
+                    keepalive += len(window)
+                    self._since_forward = 0
+                elif self._pre_roll.maxlen:
+                    self._pre_roll.append(window)
+                continue
+            self._since_forward = 0
+
+        self.input_bytes += whole
+        self.forwarded_bytes += len(out)
+        self.keepalive_bytes += keepalive
+        with _totals_lock:
+            _totals.update(input_bytes=whole, forwarded_bytes=len(out), keepalive_bytes=keepalive)
+        return bytes(out)
+
+    def get_stats(self):
+        return {
+            "enabled": self.enabled,
+            "input_bytes": self.input_bytes,
+            "forwarded_bytes": self.forwarded_bytes,
+            "keepalive_bytes": self.keepalive_bytes,
+            "speech_segments": self.segments,
+            "suppressed_fraction": 1 - self.forwarded_bytes / self.input_bytes if self.input_bytes else 0.0,
+        }
@@ -1,13 +1,13 @@
 class WebSocketHandler:
     def __init__(self):
         self.active_connections = {}
-        self.last_active_sid = None  # 👈 Track last SID
 
     def handle_connection(self, sid):
         self.active_connections[sid] = {"buffer": []}
-        self.last_active_sid = sid  # 👈 Update last active SID
+        return self.active_connections[sid]
 
     def handle_disconnection(self, sid):
-        self.active_connections.pop(sid, None)
-        if self.last_active_sid == sid:
-            self.last_active_sid = None
+        return self.active_connections.pop(sid, None)
+
+    def get_session(self, sid):
+        return self.active_connections.get(sid)